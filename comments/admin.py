@@ -1,45 +1,61 @@
+from collections import OrderedDict
+
 from django.contrib import admin
 from django.core.urlresolvers import reverse
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext as _
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
-from django.db.models import Count, IntegerField, ExpressionWrapper
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.utils.text import Truncator
 
 from .models import Comment
 from my_newsapp.models import Article
 
 # region
-# Helper function for setting lookups in a generic way - Because same pattern was used between SimpleListFilter
-# classes. We define queryset in a class, for example all users that have commented (comment authors), and then
-# obj_attr which represents field of user we want to expose filter side bar. We pass obj_attr as a string, since we
-# have to use obj.__dict__['attr'] to access object attribute as we cannot use dot notation. In URL query, id of the
-# object is exposed.
-# Without this fuction, lookup method of AuthorFilter class will be implemented like this:
-#
-#        authors = User.objects.annotate(comment_count=Count('comments')).filter(comment_count__gt=0)
-#
-#        def lookups(self, request, model_admin):
-#           authors_tuples_list = []
-#               for author in self.authors:
-#                   authors_tuples_list.append( (author.id, _(author.username)) )
-#               return authors_tuples_list 
-#
-# Now, using this helper, code can be shortened like this:
-#
-#        authors = User.objects.annotate(comment_count=Count('comments')).filter(comment_count__gt=0)
-#        
-#        def lookups(self, request, model_admin):
-#            return set_lookups(self.authors, 'username')
-#
+# Base class for filters whose options are objects related to comments (authors, owner articles, parent comments).
+# Options are queried when sidebar is rendered (on every changelist request, so they are never stale), as (id, label)
+# pairs without building model instances, and there are at most lookup_limit of them, so sidebar stays small no
+# matter how many objects there are. Which objects are listed is up to subclass (get_lookup_queryset()), and it has to
+# find them with a bounded query. Selected object is always listed, even if it is not among them. Other objects are
+# reached through search (CommentAdmin.search_fields) or ?<parameter_name>=<id> in url. Filtering itself is a plain
+# filter by id.
 # endregion
-def set_lookups(queryset, obj_attr):
-    tuples_list = []
-    for obj in queryset:
-        # append pair tuple to a list
-        tuples_list.append( (obj.id, _(obj.__dict__[obj_attr])) ) 
-    # we can return list of tuples (not neccessary tuple of tuples, like in above implementation from docs)
-    return tuples_list
+class RelatedObjectFilter(admin.SimpleListFilter):
+    lookup_limit = 20
+    label_field = None
+    filter_field = None
+
+    def get_lookup_queryset(self, request):
+        """
+        Returns queryset of objects listed as filter's options, in the order they are listed. Only the first
+        lookup_limit of them are read, so it has to be cheap to read them - ordered by an index, or restricted to
+        a bounded number of ids. Subclasses must implement it.
+        """
+        raise NotImplementedError('{} must implement get_lookup_queryset().'.format(self.__class__.__name__))
+
+    def get_label(self, label):
+        return label
+
+    def lookups(self, request, model_admin):
+        queryset = self.get_lookup_queryset(request)
+        options = list(queryset.values_list('id', self.label_field)[:self.lookup_limit])
+        selected = self.get_value_id()
+        if selected is not None and selected not in [id for id, label in options]:
+            options += list(queryset.model._default_manager.filter(id=selected).values_list('id', self.label_field))
+        return [(id, self.get_label(label)) for id, label in options]
+
+    def get_value_id(self):
+        if self.value() is None:
+            return None
+        try:
+            return int(self.value())
+        except ValueError:
+            raise IncorrectLookupParameters('Invalid {} id: {}'.format(self.parameter_name, self.value()))
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            return queryset.filter(**{self.filter_field: self.get_value_id()})
 
 class CommentOrReplyFilter(admin.SimpleListFilter):
     # Human-readable title which will be displayed in the
@@ -73,58 +89,63 @@ class CommentOrReplyFilter(admin.SimpleListFilter):
         if self.value() == 'replies':
             return queryset.exclude(parent__isnull=True)
 
-class AuthorFilter(admin.SimpleListFilter):
+# Authors of the newest recent_comments comments (read backwards along primary key), so the cost doesn't grow with
+# the number of comments - counting comments per author would group the whole comments table.
+class AuthorFilter(RelatedObjectFilter):
     title = _('author')
     parameter_name = 'author'
-    authors = User.objects.annotate(comment_count=Count('comments')).filter(comment_count__gt=0)
+    label_field = 'username'
+    filter_field = 'author_id'
+    recent_comments = 200
 
-    def lookups(self, request, model_admin):
-        return set_lookups(self.authors, 'username')
-    
-    def queryset(self, request, queryset):
-        for author in self.authors:
-            if self.value() == str(author.id): # because id from URL query is string
-                return queryset.filter(author=author.id)
+    def get_lookup_queryset(self, request):
+        recent_authors = Comment.objects.order_by('-id').values_list('author_id', flat=True)[:self.recent_comments]
+        author_ids = list(OrderedDict.fromkeys(recent_authors))[:self.lookup_limit]
+        return User.objects.filter(id__in=author_ids).order_by('username')
 
-class OwnerArticle(admin.SimpleListFilter):
+class OwnerArticle(RelatedObjectFilter):
     title = _('owner Article')
     parameter_name = 'owner'
-    articles = Article.objects.annotate(comment_count=Count('comments')).filter(comment_count__gt=0)
+    label_field = 'title'
+    filter_field = 'object_id'
 
-    def lookups(self, request, model_admin):
-        return set_lookups(self.articles, 'title')
+    def get_lookup_queryset(self, request):
+        return Article.objects.filter(comment_count__gt=0).order_by('-comment_count', '-pub_date')
 
     def queryset(self, request, queryset):
-        content_type = ContentType.objects.get(model='article')
-        for article in self.articles:
-            if self.value() == str(article.id): # because id from URL query is string
-                qs = queryset.filter(content_type=content_type, object_id=article.id)
-                print('returning qs: ', qs)
-                return qs
-
-class ParentComment(admin.SimpleListFilter):
+        queryset = super().queryset(request, queryset)
+        if self.value() is not None:
+            return queryset.filter(content_type=ContentType.objects.get_for_model(Article))
+
+class ParentComment(RelatedObjectFilter):
     title = _('parent (for replies)')
     parameter_name = 'parent'
-    parent_comments = Comment.objects.annotate(replies_count=Count('replies')).filter(replies_count__gt=0)
+    label_field = 'text'
+    filter_field = 'parent_id'
 
-    def lookups(self, request, model_admin):
-        return set_lookups(self.parent_comments, 'text')
-        
-    def queryset(self, request, queryset):
-        for parent in self.parent_comments:
-            if self.value() == str(parent.id): # because id from URL query is string
-                return queryset.filter(parent=parent.id)
+    def get_lookup_queryset(self, request):
+        return Comment.objects.filter(reply_count__gt=0).order_by('-reply_count', '-pub_date')
+
+    def get_label(self, label):
+        return Truncator(label).chars(50)
         
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_filter = (CommentOrReplyFilter, AuthorFilter, ParentComment, OwnerArticle,)
 
     list_display = ('id', 'author_link', 'text', 'pub_date_reformated', 'owner_object',  'parent_link', 'replies_link') 
+    search_fields = ('text', 'author__username')
     parent_id = None
+
+    # Authors and parents are joined, owners (content_object) are prefetched with one query per owner model - only for
+    # comments on the current page, as prefetch runs when page is fetched. Together with denormalized reply_count,
+    # changelist costs the same number of queries no matter how many rows it shows.
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author', 'parent').prefetch_related('content_object')
         
     def author_link(self, obj):
         return mark_safe('<a href="{}">{}</a>'.format(
-            reverse('admin:auth_user_change', args=(obj.author.pk,)),
+            reverse('admin:auth_user_change', args=(obj.author_id,)),
             obj.author
         ))
     author_link.short_description = 'author' 
@@ -144,6 +165,8 @@ class CommentAdmin(admin.ModelAdmin):
     parent_link.admin_order_field = 'parent'
 
     def owner_object(self, obj):
+        if obj.content_object is None: # owner was deleted
+            return '-'
         owner_model = obj.content_object.__class__.__name__.lower()
         owner_app = obj.content_object._meta.app_label
         return mark_safe('<a href="{}">{} - {}</a>'.format(
@@ -161,24 +184,14 @@ class CommentAdmin(admin.ModelAdmin):
     pub_date_reformated.admin_order_field = 'pub_date'
 
     def replies_link(self, obj):
-        if obj.parent != None: # if obj is reply, display '-'
+        if obj.parent_id is not None: # if obj is reply, display '-'
             return '-'
-        if obj.replies.count() > 0: # if obj is comment - link & num of replies
+        if obj.reply_count > 0: # if obj is comment - link & num of replies
             return mark_safe('<a href="{}{}">{}</a>'.format(
                 reverse('admin:comments_comment_changelist'),
                 '?parent={}'.format(obj.id),
-                '{} Replies'.format(obj.replies.count())          
+                '{} Replies'.format(obj.reply_count)
             ))
         return 'no Replies' # obj is comment,  but has no replies
     replies_link.short_description = 'replies'
-    replies_link.admin_order_field = 'replies_count' 
-
-    def get_queryset(self, request):
-        qs = super(CommentAdmin, self).get_queryset(request)
-        qs = qs.annotate(
-            replies_count=ExpressionWrapper(
-                Count('replies'), 
-                output_field=IntegerField()
-            )
-        )
-        return qs
\ No newline at end of file
+    replies_link.admin_order_field = 'reply_count' 
\ No newline at end of file
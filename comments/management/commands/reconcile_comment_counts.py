@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+
+from comments.models import Comment
+
+# region
+# Comment.reply_count and comment owner's comment_count (for example Article.comment_count) are denormalized counters,
+# maintained by Comment.update_counts() in create/reply/delete views. Comments created or deleted in some other way
+# (admin, shell, raw SQL) make them drift - this command recalculates them and fixes rows which are off.
+# Usage:
+#   python manage.py reconcile_comment_counts [--dry-run]
+# endregion
+class Command(BaseCommand):
+    help = "Recalculates comments' reply_count and comment owners' comment_count, fixing those which drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report counters which are off.')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+
+        reply_counts = self.counts(Comment.objects.filter(parent__isnull=False), 'parent_id')
+        self.reconcile(Comment, 'reply_count', reply_counts)
+
+        for model in apps.get_models():
+            if not any(field.name == 'comment_count' for field in model._meta.get_fields()):
+                continue
+            comments = Comment.objects.filter(content_type=ContentType.objects.get_for_model(model), parent=None)
+            self.reconcile(model, 'comment_count', self.counts(comments, 'object_id'))
+
+    def counts(self, comments, group_by):
+        return dict(comments.values_list(group_by).annotate(count=Count('id')).order_by())
+
+    def reconcile(self, model, field, counts):
+        fixed = 0
+        for pk, stored in model._default_manager.values_list('pk', field).iterator():
+            actual = counts.get(pk, 0)
+            if stored != actual:
+                fixed += 1
+                if not self.dry_run:
+                    model._default_manager.filter(pk=pk).update(**{field: actual})
+        verb = 'are off' if self.dry_run else 'fixed'
+        self.stdout.write('{}.{}: {} {}'.format(model.__name__, field, fixed, verb))
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.17 on 2026-10-18 18:35
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+def count_replies(apps, schema_editor):
+    Comment = apps.get_model('comments', 'Comment')
+    counts = (Comment.objects.filter(parent__isnull=False)
+              .values_list('parent_id').annotate(count=models.Count('id')).order_by())
+    for parent_id, count in counts:
+        Comment.objects.filter(pk=parent_id).update(reply_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0013_auto_20190227_2100'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_replies, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,14 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.auth.models import User
 
+class CommentsQuerySet(models.QuerySet):
+    # top-level comments (not replies) of owner object - served by comment_owner_pub_date_idx
+    def top_level(self, content_type, object_id):
+        return self.filter(content_type=content_type, object_id=object_id, parent=None)
+
 class Comment(models.Model):
     author = models.ForeignKey(User, related_name='comments', on_delete=models.DO_NOTHING)
     text = models.TextField()
@@ -11,9 +17,40 @@ class Comment(models.Model):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
     parent = models.ForeignKey('self', null=True, blank=True, related_name='replies', on_delete=models.CASCADE)
+    # denormalized number of replies, maintained by update_counts()
+    reply_count = models.PositiveIntegerField(default=0)
+
+    objects = CommentsQuerySet.as_manager()
 
     def __str__(self):
         return self.text
 
+    # region
+    # Adds delta (1 on create, -1 on delete) to parent's reply_count if comment is reply, or to owner's comment_count
+    # if it is (top-level) comment - but only if owner model has comment_count field (for example Article), as
+    # comments can be attached to any model. F() expressions make increment a single UPDATE in database, so concurrent
+    # requests can't overwrite each other's counts. Counter which has drifted below delta (comments deleted in admin
+    # or directly in database) is left as it is instead of going negative - counters are unsigned in MySQL, so that
+    # UPDATE would fail - and is fixed by reconcile_comment_counts command. Call it in the same transaction in which
+    # comment is saved/deleted.
+    # endregion
+    def update_counts(self, delta):
+        if self.parent_id is not None:
+            queryset, field = Comment.objects.filter(pk=self.parent_id), 'reply_count'
+        else:
+            owner_model = ContentType.objects.get_for_id(self.content_type_id).model_class()
+            if not any(field.name == 'comment_count' for field in owner_model._meta.get_fields()):
+                return
+            queryset, field = owner_model._default_manager.filter(pk=self.object_id), 'comment_count'
+        if delta < 0:
+            queryset = queryset.filter(**{field + '__gte': -delta})
+        queryset.update(**{field: F(field) + delta})
+
     class Meta:
-        ordering = ['-pub_date']
\ No newline at end of file
+        # id breaks ties between comments published at the same time, so (pub_date, id) cursor is unambiguous
+        ordering = ['-pub_date', '-id']
+        # cursor pagination of owner's comments (see pagination.py)
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'parent', 'pub_date', 'id'],
+                         name='comment_owner_pub_date_idx'),
+        ]
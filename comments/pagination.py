@@ -0,0 +1,27 @@
+from django.db.models import Q
+
+# region
+# Cursor pagination of owner's top-level comments, newest first.
+#
+# Next page is addressed by (pub_date, id) of the last rendered comment, and fetched with
+#   WHERE content_type = ? AND object_id = ? AND parent IS NULL AND (pub_date, id) < cursor
+#   ORDER BY pub_date DESC, id DESC LIMIT limit + 1
+# which is a range scan of comment_owner_pub_date_idx, so page costs the same on article with 10 or 10 000 comments.
+# The extra row only tells if there are more comments after the page (has_more) - no exists() or count() query.
+#
+# Cursor is opaque to clients (see my_newsapp/cursors.py), rendered as data-cursor attribute of every comment (see
+# comments_snippet.html and cursor filter).
+# endregion
+# comments rendered with owner's page; more are loaded COMMENTS_PAGE_SIZE at a time (see load_comments.js)
+COMMENTS_FIRST_PAGE_SIZE = 5
+COMMENTS_PAGE_SIZE = 10
+COMMENTS_PAGE_MAX_SIZE = 50
+
+# returns (comments, has_more) - comments after cursor (from the newest one if cursor is None), at most limit of them
+def get_comments_page(queryset, cursor, limit):
+    queryset = queryset.order_by('-pub_date', '-id')
+    if cursor is not None:
+        pub_date, id = cursor
+        queryset = queryset.filter(Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=id))
+    comments = list(queryset[:limit + 1])
+    return comments[:limit], len(comments) > limit
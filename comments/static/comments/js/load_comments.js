@@ -17,8 +17,9 @@ function loadMoreComments(lastRenderedCommentId, numOfCommentsToLoad){
         url : '/comments/load-more-comments/',
         type : "GET",
         data : { 
-            lastRenderedCommentId: lastRenderedCommentId, // used by django to filter comments with ids < lastRenderedCommentId (next ones in db)
-            numOfCommentsToLoad: numOfCommentsToLoad, // num of comments to return from database
+            after: $('#' + lastRenderedCommentId).attr('data-cursor'), // (pub_date, id) cursor of last rendered comment - django returns comments after it
+            limit: numOfCommentsToLoad, // num of comments to return from database
+            content_type_id: window.comments.content_type_id,
             owner_id: window.comments.owner_id
         }, 
         success : function(loadedComments) {
@@ -1,5 +1,7 @@
 from django import template
 
+from my_newsapp.cursors import encode_cursor
+
 register = template.Library()
 
 #comment
@@ -15,11 +17,7 @@ register = template.Library()
 def for_comment(replies, comment_id):
     return replies.filter(parent_id=comment_id)
 
-# returns 5 newest comments
-@register.filter
-def first_five(comments):
-    return comments.all()[:5]
-
+# cursor for loading comments after this one (see load_more_comments view)
 @register.filter
-def substract(comments, num):
-    return comments.count() - num;
\ No newline at end of file
+def cursor(comment):
+    return encode_cursor(comment)
@@ -27,6 +27,13 @@ class CommentFactory(factory.django.DjangoModelFactory):
     # endregion
     content_object = factory.LazyAttribute(lambda obj: obj.content_type.get_object_for_this_type(pk=obj.object_id))
 
+    # keeps denormalized counters (parent's reply_count, owner's comment_count) in sync, as views do
+    @classmethod
+    def _create(cls, model_class, *args, **kwargs):
+        comment = super()._create(model_class, *args, **kwargs)
+        comment.update_counts(1)
+        return comment
+
 
 class ReplyFactory(CommentFactory):
 
@@ -0,0 +1,104 @@
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import translation
+
+from my_newsapp.tests.factories import ArticleFactory
+from comments.admin import AuthorFilter
+from .factories import CommentFactory, ReplyFactory
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+class CommentAdminTests(TestCase):
+    # session, user, options of author (recent authors, then their usernames), parent and owner filters, filtered and
+    # total count, page of comments with authors and parents, and their owners (one query per owner model)
+    CHANGELIST_QUERIES = 10
+
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        self.url = reverse('admin:comments_comment_changelist')
+
+    def tearDown(self):
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    def create_comments(self, articles, comments_per_article):
+        for article in ArticleFactory.create_batch(size=articles):
+            for comment in CommentFactory.create_batch(size=comments_per_article, object_id=article.id):
+                ReplyFactory(object_id=article.id, parent=comment)
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_shows_links(self):
+        article = ArticleFactory()
+        comment = CommentFactory(object_id=article.id)
+        reply = ReplyFactory(object_id=article.id, parent=comment)
+        response = self.client.get(self.url)
+        self.assertContains(response, reverse('admin:auth_user_change', args=(reply.author_id,)))
+        self.assertContains(response, reverse('admin:my_newsapp_article_change', args=(article.id,)))
+        self.assertContains(response, reverse('admin:comments_comment_change', args=(comment.id,)))
+        self.assertContains(response, '1 Replies')
+
+    def test_query_count_does_not_depend_on_rows(self):
+        self.create_comments(articles=1, comments_per_article=1)
+        self.changelist_queries() # warm up (content types cache)
+        small_page = self.changelist_queries()
+
+        self.create_comments(articles=10, comments_per_article=4) # 2 + 80 rows, first page shows 100
+        self.assertEqual(self.changelist_queries(), small_page)
+        self.assertEqual(small_page, self.CHANGELIST_QUERIES)
+
+    def test_filter_options_are_current(self):
+        self.client.get(self.url)
+        article = ArticleFactory(title='Commented article')
+        comment = CommentFactory(object_id=article.id)
+        response = self.client.get(self.url)
+        self.assertContains(response, '?author={}'.format(comment.author_id))
+        self.assertContains(response, 'Commented article')
+
+    def test_author_options_are_recent_authors(self):
+        article = ArticleFactory()
+        old = CommentFactory(object_id=article.id)
+        CommentFactory.create_batch(size=3, object_id=article.id)
+        with patch.object(AuthorFilter, 'recent_comments', 3):
+            response = self.client.get(self.url)
+        self.assertContains(response, '?author=', count=3)
+        self.assertNotContains(response, '?author={}"'.format(old.author_id))
+
+    def test_filter_options_are_capped(self):
+        article = ArticleFactory()
+        CommentFactory.create_batch(size=AuthorFilter.lookup_limit + 5, object_id=article.id)
+        response = self.client.get(self.url)
+        self.assertContains(response, '?author=', count=AuthorFilter.lookup_limit)
+
+    def test_selected_option_is_listed_even_if_capped(self):
+        article = ArticleFactory()
+        comment = CommentFactory(object_id=article.id)
+        CommentFactory.create_batch(size=AuthorFilter.lookup_limit, object_id=article.id) # newer authors are listed
+        response = self.client.get(self.url, {'author': comment.author_id})
+        self.assertContains(response, '?author={}'.format(comment.author_id))
+        self.assertEqual(list(response.context['cl'].result_list), [comment])
+
+    def test_filter_by_id(self):
+        article, other_article = ArticleFactory(), ArticleFactory()
+        comment = CommentFactory(object_id=article.id)
+        reply = ReplyFactory(object_id=article.id, parent=comment)
+        CommentFactory(object_id=other_article.id)
+
+        response = self.client.get(self.url, {'owner': article.id})
+        self.assertEqual(set(response.context['cl'].result_list), {comment, reply})
+        response = self.client.get(self.url, {'parent': comment.id})
+        self.assertEqual(list(response.context['cl'].result_list), [reply])
+
+    def test_invalid_filter_value(self):
+        response = self.client.get(self.url, {'author': 'invalid'})
+        self.assertRedirects(response, self.url + '?e=1', fetch_redirect_response=False)
@@ -1,6 +1,8 @@
 import tempfile
+from io import StringIO
 
 from django.test import TestCase, override_settings
+from django.core.management import call_command
 
 from my_newsapp.tests.factories import ArticleFactory
 from comments.models import Comment
@@ -22,3 +24,48 @@ class CommentTests(TestCase):
         for i in range( 0, comments.count() - 1):
             self.assertTrue(comments[i].pub_date > comments[i+1].pub_date)
 
+    def test_update_counts(self):
+        comment = CommentFactory(object_id=self.comment_owner.id)
+        ReplyFactory.create_batch(size=2, object_id=self.comment_owner.id, parent=comment)
+        comment.refresh_from_db()
+        self.comment_owner.refresh_from_db()
+        self.assertEqual(comment.reply_count, 2)
+        self.assertEqual(self.comment_owner.comment_count, 1) # replies are not counted
+
+        comment.update_counts(-1)
+        self.comment_owner.refresh_from_db()
+        self.assertEqual(self.comment_owner.comment_count, 0)
+
+    def test_update_counts_doesnt_go_below_zero(self):
+        comment = CommentFactory(object_id=self.comment_owner.id)
+        reply = ReplyFactory(object_id=self.comment_owner.id, parent=comment)
+        Comment.objects.filter(pk=comment.pk).update(reply_count=0)
+        self.comment_owner.__class__.objects.filter(pk=self.comment_owner.pk).update(comment_count=0)
+
+        reply.update_counts(-1)
+        comment.update_counts(-1)
+        comment.refresh_from_db()
+        self.comment_owner.refresh_from_db()
+        self.assertEqual(comment.reply_count, 0)
+        self.assertEqual(self.comment_owner.comment_count, 0)
+
+    def test_reconcile_comment_counts_command(self):
+        comment = CommentFactory(object_id=self.comment_owner.id)
+        ReplyFactory(object_id=self.comment_owner.id, parent=comment)
+        Comment.objects.filter(pk=comment.pk).update(reply_count=5)
+        self.comment_owner.__class__.objects.filter(pk=self.comment_owner.pk).update(comment_count=0)
+
+        out = StringIO()
+        call_command('reconcile_comment_counts', '--dry-run', stdout=out)
+        self.assertIn('Comment.reply_count: 1 are off', out.getvalue())
+        self.assertIn('Article.comment_count: 1 are off', out.getvalue())
+        comment.refresh_from_db()
+        self.assertEqual(comment.reply_count, 5)
+
+        out = StringIO()
+        call_command('reconcile_comment_counts', stdout=out)
+        self.assertIn('Comment.reply_count: 1 fixed', out.getvalue())
+        comment.refresh_from_db()
+        self.comment_owner.refresh_from_db()
+        self.assertEqual(comment.reply_count, 1)
+        self.assertEqual(self.comment_owner.comment_count, 1)
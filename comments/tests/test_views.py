@@ -3,13 +3,17 @@ from urllib.parse import quote_plus
 
 from django.test import TestCase, TransactionTestCase, override_settings
 from django.views.generic import TemplateView
-from django.db.models.query import QuerySet
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from comments.views import CommentsContextMixin
 from comments.models import Comment
+from comments.pagination import COMMENTS_PAGE_MAX_SIZE
+from my_newsapp.cursors import encode_cursor
 from my_newsapp.models import Article
 from my_newsapp.tests.factories import ArticleFactory
 from .factories import CommentFactory, ReplyFactory
@@ -38,15 +42,27 @@ class CommentsContextMixinTests(TestCase):
 
         for key in ['comments', 'owner_id', 'owner_model', 'comment_form', 'reply_form', 'edit_form', 'login_url']:
             self.assertTrue(key in context)
-        self.assertIsInstance(context['comments'], QuerySet)
         self.assertIsInstance(context['comments'][0], Comment)
-        self.assertEqual(context['comments'].count(), 5)
+        self.assertEqual(len(context['comments']), 5)
         self.assertEqual(context['owner_id'], self.comments_owner.id)
         self.assertEqual(context['owner_model'], 'Article')
         self.assertIsInstance(context['comment_form'], CommentForm)
         self.assertIsInstance(context['reply_form'], ReplyForm)
         self.assertIsInstance(context['edit_form'], EditForm)
         self.assertEqual(context['login_url'], settings.LOGIN_URL)
+
+    def test_comments_are_loaded_with_replies_and_authors(self):
+        CommentFactory.create_batch(size=3, object_id=self.comments_owner.id) # 8 comments, 5 on first page
+        for comment in list(Comment.objects.all()):
+            ReplyFactory.create_batch(size=2, object_id=self.comments_owner.id, parent=comment)
+
+        with self.assertNumQueries(3): # page of comments, their replies, comments count
+            context = self.test_view.get_context_data()
+        with self.assertNumQueries(0):
+            thread = [(comment.author.username, [reply.author.username for reply in comment.replies.all()])
+                      for comment in context['comments']]
+        self.assertEqual(len(thread), 5)
+        self.assertTrue(all(len(replies) == 2 for author, replies in thread))
         
 @override_settings(ROOT_URLCONF = 'comments.tests.urls', MEDIA_ROOT=tempfile.gettempdir() + '/')
 class CommentsOwnerViewAnonymousUserTests(TestCase):
@@ -296,6 +312,11 @@ class CreateCommentTests(TestCase):
             f'delete-button-{created_comment.id}']:
             self.assertContains(response, content) 
 
+    def test_comment_increments_owner_comment_count(self):
+        self.client.post(self.url, data=self.data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.comment_owner.refresh_from_db()
+        self.assertEqual(self.comment_owner.comment_count, 1)
+
 @override_settings(
     ROOT_URLCONF = 'comments.tests.urls',
     LOGIN_URL = '/admin/login',
@@ -368,6 +389,13 @@ class CreateReplyTests(TestCase):
             created_reply.text, f'edit-form-{created_reply.id}', f'delete-button-{created_reply.id}']:
             self.assertContains(response, content)
 
+    def test_reply_increments_parent_reply_count_only(self):
+        self.client.post(self.url, data=self.data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.reply_parent.refresh_from_db()
+        self.comment_owner.refresh_from_db()
+        self.assertEqual(self.reply_parent.reply_count, 1)
+        self.assertEqual(self.comment_owner.comment_count, 1) # only reply_parent
+
 @override_settings(
     ROOT_URLCONF = 'comments.tests.urls',
     LOGIN_URL = '/admin/login',
@@ -451,6 +479,16 @@ class DeleteTests(TestCase):
             Comment.objects.get(id=self.comment.id)
             self.assertEqual(context.exception.msg, 'Comment matching query does not exist.')
 
+    def test_delete_decrements_counts(self):
+        reply = ReplyFactory(object_id=self.comment_owner.id, parent=self.comment)
+        self.client.post(reverse('comments:delete', kwargs={'pk': reply.id}), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.reply_count, 0)
+
+        self.client.post(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.comment_owner.refresh_from_db()
+        self.assertEqual(self.comment_owner.comment_count, 0)
+
 @override_settings(ROOT_URLCONF = 'comments.tests.urls', MEDIA_ROOT=tempfile.gettempdir() + '/')
 class LoadMoreCommentsTests(TransactionTestCase):
     reset_sequences = True
@@ -484,40 +522,91 @@ class LoadMoreCommentsTests(TransactionTestCase):
         response = self.client.post(self.url)
         self.assertEqual(response.status_code, 403)
 
-    def test_2_visible_2_to_load(self):
-        data = {
-            'lastRenderedCommentId': self.comments[1].id,
-            'numOfCommentsToLoad': 2,
+    def get_data(self, last_rendered, limit):
+        return {
+            'after': encode_cursor(last_rendered),
+            'limit': limit,
+            'content_type_id': ContentType.objects.get_for_model(Article).id,
             'owner_id': self.comments_owner.id
         }
+
+    def test_2_visible_2_to_load(self):
+        data = self.get_data(self.comments[1], 2)
         response = self.client.get(self.url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
-        for key in ['next_comments', 'reply_form', 'edit_form']:
+        for key in ['next_comments', 'has_more', 'reply_form', 'edit_form']:
             self.assertTrue(key in response.context)
 
         next_comments = response.context['next_comments']  
         self.assertEqual([comment.id for comment in next_comments], [comment.id for comment in self.comments[2:4]])
+        self.assertTrue(response.context['has_more'])
+        self.assertEqual(response['X-Has-More'], 'true')
 
     def test_2_visible_6_to_load(self):
         # It is requested for 6 to load, but there are only 4 left to load
-        data = {
-            'lastRenderedCommentId': self.comments[1].id,
-            'numOfCommentsToLoad': 6,
-            'owner_id': self.comments_owner.id
-        }
+        data = self.get_data(self.comments[1], 6)
         response = self.client.get(self.url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
-        for key in ['next_comments', 'reply_form', 'edit_form']:
+        for key in ['next_comments', 'has_more', 'reply_form', 'edit_form']:
             self.assertTrue(key in response.context)
 
         next_comments = response.context['next_comments']
         self.assertEqual(
             [comment.id for comment in next_comments], [comment.id for comment in self.comments[2:6]])
+        self.assertFalse(response.context['has_more'])
+        self.assertEqual(response['X-Has-More'], 'false')
 
     def test_no_comments_in_db(self):
-        data = {
-            'lastRenderedCommentId': self.comments[5].id,
-            'numOfCommentsToLoad': 4,
-            'owner_id': self.comments_owner.id
-        }
+        data = self.get_data(self.comments[5], 4)
         self.comments.delete()
         response = self.client.get(self.url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
         self.assertEqual(response.status_code, 400)
+
+    def test_rendered_comments_have_cursor(self):
+        response = self.client.get(self.url, self.get_data(self.comments[1], 2), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertContains(response, 'data-cursor="{}"'.format(encode_cursor(self.comments[2])))
+
+    def test_replies_and_other_owners_comments_are_not_loaded(self):
+        comments = list(self.comments)
+        ReplyFactory(object_id=self.comments_owner.id, parent=comments[0])
+        CommentFactory(object_id=ArticleFactory().id)
+        response = self.client.get(self.url, self.get_data(comments[1], 10), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(
+            [comment.id for comment in response.context['next_comments']], [comment.id for comment in comments[2:6]])
+
+    def test_limit_is_capped(self):
+        response = self.client.get(
+            self.url, self.get_data(self.comments[0], COMMENTS_PAGE_MAX_SIZE + 1), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(len(response.context['next_comments']), 5)
+
+    def test_invalid_parameters(self):
+        for key, value in [('after', 'invalid-cursor'), ('limit', 'a'), ('limit', 0), ('content_type_id', 0)]:
+            data = self.get_data(self.comments[1], 2)
+            data[key] = value
+            response = self.client.get(self.url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'owner_id': self.comments_owner.id}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 400)
+
+    # page is a single LIMIT n + 1 query, no exists() or count()
+    def test_page_is_fetched_with_single_query(self):
+        data = self.get_data(self.comments[1], 2)
+        ContentType.objects.get_for_model(Article) # content type is cached, as it is in running server
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        comment_queries = [query['sql'] for query in queries.captured_queries
+                           if query['sql'].startswith('SELECT') and 'FROM "comments_comment"' in query['sql']
+                           and '"comments_comment"."parent_id" IS NULL' in query['sql']]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn('LIMIT 3', comment_queries[0])
+        self.assertNotIn('COUNT(', comment_queries[0])
+
+    # comments with their authors, replies with their authors - no matter how many comments and replies are rendered
+    def test_page_is_rendered_with_two_queries(self):
+        comments = list(self.comments)
+        for comment in comments:
+            ReplyFactory.create_batch(size=2, object_id=self.comments_owner.id, parent=comment)
+        ContentType.objects.get_for_model(Article)
+        for limit in [1, 4]:
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url, self.get_data(comments[0], limit), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertEqual(len(response.context['next_comments']), limit)
+            self.assertContains(response, 'class="reply', count=limit * 2)
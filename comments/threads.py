@@ -0,0 +1,19 @@
+from django.db.models import Prefetch
+
+from .models import Comment
+from .pagination import get_comments_page
+
+# region
+# Loads page of top-level comments with their replies - the whole rendered thread - in two queries:
+#   1. page of comments with their authors, 2. replies of all comments on the page with their authors
+# Prefetched replies are grouped by parent in python, so comment.replies.all in replies.html (and reply.author in
+# reply_snippet.html) don't hit database. Without it every rendered comment would cost queries for its author, its
+# replies and their authors.
+# endregion
+def with_thread(queryset):
+    replies = Comment.objects.select_related('author').order_by('-pub_date', '-id')
+    return queryset.select_related('author').prefetch_related(Prefetch('replies', queryset=replies))
+
+# returns (comments, has_more) - see get_comments_page
+def load_thread(queryset, cursor, limit):
+    return get_comments_page(with_thread(queryset), cursor, limit)
@@ -5,23 +5,30 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse, HttpResponseBadRequest
+from django.db import transaction
 
 from .models import Comment
 from .forms import CommentForm, ReplyForm, EditForm
+from .pagination import COMMENTS_FIRST_PAGE_SIZE, COMMENTS_PAGE_SIZE, COMMENTS_PAGE_MAX_SIZE
+from .threads import load_thread
 from .decorators import require_ajax
+from my_newsapp.cursors import decode_cursor
+from my_newsapp.db_router import replica_reads
 
 class CommentsContextMixin:
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        comments = Comment.objects.filter(
-            content_type=ContentType.objects.get(model=self.model.__name__),
-            object_id=self.kwargs['id'],
-            parent=None 
-        )
+        content_type = ContentType.objects.get_for_model(self.model)
+        comments = Comment.objects.top_level(content_type, self.kwargs['id'])
+        # owner's denormalized comment_count spares COUNT query (template needs it several times)
+        comments_count = getattr(getattr(self, 'object', None), 'comment_count', None)
         data = {
-            'comments': comments,
+            # first comments with their replies (see threads.py), the rest is loaded by load_more_comments
+            'comments': load_thread(comments, None, COMMENTS_FIRST_PAGE_SIZE)[0],
+            'comments_count': comments_count if comments_count is not None else comments.count(),
             'owner_id': self.kwargs['id'],
             'owner_model': self.model.__name__,
+            'owner_content_type_id': content_type.id,
             'comment_form': CommentForm(),
             'reply_form': ReplyForm(),
             'edit_form': EditForm(),
@@ -46,12 +53,14 @@ def create_comment(request):
             }
         return render(request, 'comments/comments.html', context)
 
+@transaction.atomic
 def save_comment_form(request, form):
     form.save(commit=False)
     form.instance.author = request.user
     form.instance.content_type_id = ContentType.objects.get(model=request.POST['owner_model']).id
     form.instance.object_id = request.POST['owner_id']
     form.save()
+    form.instance.update_counts(1)
 
 @login_required
 @require_POST
@@ -70,6 +79,7 @@ def create_reply(request):
             } 
         return render(request, 'comments/replies.html', context)
 
+@transaction.atomic
 def save_reply_form(request, form):
     form.save(commit=False)
     form.instance.author = request.user
@@ -79,6 +89,7 @@ def save_reply_form(request, form):
     # assign parent_id to reply
     form.instance.parent_id = request.POST['parent_id']
     form.save()
+    form.instance.update_counts(1)
 
 @login_required
 @require_POST
@@ -96,27 +107,42 @@ def edit(request, pk):
 @require_ajax
 def delete(request, pk):
     target = get_object_or_404(Comment, pk=pk)
-    target.delete()
+    with transaction.atomic():
+        target.update_counts(-1)
+        target.delete()
     return HttpResponse(status=204)
 
+# region
+# Returns next page of owner's top-level comments after the last rendered one. GET parameters:
+#   content_type_id, owner_id - owner object
+#   after - cursor of the last rendered comment (its data-cursor attribute)
+#   limit - number of comments to load (default COMMENTS_PAGE_SIZE, at most COMMENTS_PAGE_MAX_SIZE)
+# Page is fetched with a single query (see pagination.py). X-Has-More header ('true'/'false') tells if there are more
+# comments after the page. Missing or invalid parameters, and no comments after cursor, are 400.
+# endregion
+@replica_reads
 @require_ajax
 def load_more_comments(request):
-    last_visible = request.GET['lastRenderedCommentId']
-    comments_to_load = int(request.GET['numOfCommentsToLoad'])
-    comments_owner_id = request.GET['owner_id']
-    # How much more comments is in database 
-    remaining_comments = Comment.objects.filter(id__lt=last_visible, object_id=comments_owner_id)
-    if remaining_comments.exists():
-        context = {
-            'load_more': True, # bool for check in template
-            'next_comments': get_next_comments(remaining_comments, comments_to_load),
-            'reply_form': ReplyForm(),
-            'edit_form': EditForm()
-            }
-        return render(request, 'comments/comments.html', context)
-    return HttpResponseBadRequest() # same as HttpResponse(status=400)
-    
-def get_next_comments(remaining_comments, comments_to_load):
-    if remaining_comments.count() >= comments_to_load:
-        return remaining_comments[:comments_to_load]
-    return remaining_comments
\ No newline at end of file
+    try:
+        content_type = ContentType.objects.get_for_id(int(request.GET['content_type_id']))
+        owner_id = int(request.GET['owner_id'])
+        cursor = decode_cursor(request.GET['after'])
+        limit = min(int(request.GET.get('limit', COMMENTS_PAGE_SIZE)), COMMENTS_PAGE_MAX_SIZE)
+    except (KeyError, ValueError, ContentType.DoesNotExist):
+        return HttpResponseBadRequest()
+    if limit < 1:
+        return HttpResponseBadRequest()
+
+    next_comments, has_more = load_thread(Comment.objects.top_level(content_type, owner_id), cursor, limit)
+    if not next_comments:
+        return HttpResponseBadRequest() # same as HttpResponse(status=400)
+    context = {
+        'load_more': True, # bool for check in template
+        'next_comments': next_comments,
+        'has_more': has_more,
+        'reply_form': ReplyForm(),
+        'edit_form': EditForm()
+        }
+    response = render(request, 'comments/comments.html', context)
+    response['X-Has-More'] = 'true' if has_more else 'false'
+    return response
@@ -55,13 +55,15 @@ INSTALLED_APPS = [
 
     'rosetta',
     'betterforms', # is it used?
-    'fileprovider', # is it used?
+    'fileprovider', # file download offload (FILEPROVIDER_NAME)
     'my_newsapp',
     'comments',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # outside of session middleware, so session writes make user's reads sticky to primary database as well
+    'my_newsapp.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -74,6 +76,10 @@ MIDDLEWARE = [
 
 ]
 
+# logs requests which run more queries than their view's budget (see my_newsapp/query_budget.py) - for staging
+if env.bool('DJANGO_QUERY_BUDGET_MIDDLEWARE', default=False):
+    MIDDLEWARE.append('my_newsapp.query_budget.QueryBudgetMiddleware')
+
 ROOT_URLCONF = 'my_news.urls'
 # ROOT_URLCONF = 'comments.tests.urls'
 
@@ -99,9 +105,26 @@ WSGI_APPLICATION = 'my_news.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/1.11/ref/settings/#databases
 
+# region connection pool
+# With DATABASE_POOL (default) connections are pooled per worker process by my_newsapp.mysql_pool backend (see
+# my_newsapp/db_pool.py), instead of connecting to MySQL on every request. CONN_MAX_AGE stays 0 - connection Django
+# closes at the end of request goes back to the pool. Per environment:
+#   DATABASE_POOL_SIZE - connections per worker, at least number of threads worker serves requests with
+#   DATABASE_POOL_IDLE_TIMEOUT - seconds, below MySQL's wait_timeout
+#   DATABASE_POOL_WAIT_TIMEOUT - seconds request waits for a connection when all of them are in use
+#   DATABASE_POOL_VALIDATE - ping connection on checkout
+# endregion
+DATABASE_POOL = {
+    'SIZE': env.int('DATABASE_POOL_SIZE', default=5),
+    'IDLE_TIMEOUT': env.int('DATABASE_POOL_IDLE_TIMEOUT', default=300),
+    'WAIT_TIMEOUT': env.float('DATABASE_POOL_WAIT_TIMEOUT', default=5),
+    'VALIDATE': env.bool('DATABASE_POOL_VALIDATE', default=True),
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'my_newsapp.mysql_pool' if env.bool('DATABASE_POOL', default=True) else 'django.db.backends.mysql',
+        'POOL': DATABASE_POOL,
         'NAME': env('DATABASE_NAME'),
         'USER': env('DATABASE_USER'),
         'PASSWORD': env('DATABASE_PASSWORD'),
@@ -110,6 +133,20 @@ DATABASES = {
     }
 }
 
+# region read replicas
+# DATABASE_REPLICA_HOSTS - comma separated hosts of read replicas of default database (same name, user and password),
+# each one becomes 'replica<n>' alias. Reads of safe GET views are sent to them (see my_newsapp/db_router.py), except
+# for users who have written something in the last DJANGO_REPLICA_STICKY_SECONDS. Without replicas everything uses
+# default. Tests mirror replicas to default database.
+# endregion
+DATABASE_REPLICAS = []
+for number, host in enumerate(env.list('DATABASE_REPLICA_HOSTS', default=[]), start=1):
+    DATABASES['replica{}'.format(number)] = dict(DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append('replica{}'.format(number))
+
+DATABASE_ROUTERS = ['my_newsapp.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = env.int('DJANGO_REPLICA_STICKY_SECONDS', default=10)
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -164,14 +201,115 @@ MEDIA_URL = '/media/'
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# region cache
+# Redis cache shared by all workers (navigation tree, full-page cache ...). Without DJANGO_CACHE_URL (local
+# development, tests) every process gets its own in-memory cache, which behaves the same but isn't shared.
+#   DJANGO_CACHE_URL - e.g. redis://127.0.0.1:6379/1
+#   DJANGO_CACHE_VERSION - deploy version, bump it to orphan every key written by the previous release
+# Values are pickled - cached pages (see my_newsapp/page_cache.py) hold response's content bytes, which JSON can't
+# serialize.
+# Keys are built with my_newsapp.cache_keys helpers, which add language code to language dependent keys.
+# endregion
+CACHE_URL = env('DJANGO_CACHE_URL', default='')
+CACHE_VERSION = env.int('DJANGO_CACHE_VERSION', default=1)
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'my_news',
+            'VERSION': CACHE_VERSION,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'COMPRESSOR': 'django_redis.compressors.zlib.ZlibCompressor',
+                'SERIALIZER': 'django_redis.serializers.pickle.PickleSerializer',
+                # cache is an optimization - if Redis is down, pages are rendered from database instead of erroring
+                'IGNORE_EXCEPTIONS': True,
+            },
+        },
+        # Sessions are not versioned by deploy (bumping CACHE_VERSION would log everyone out) and Redis errors are
+        # not ignored, as lost session write means lost login.
+        'sessions': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'my_news_sessions',
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'my_news',
+            'KEY_PREFIX': 'my_news',
+            'VERSION': CACHE_VERSION,
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'my_news_sessions',
+        },
+    }
+
+# region sessions and messages
+# DJANGO_SESSION_ENGINE:
+#   'db' - every request of logged in user reads session row from django_session (and writes it when modified)
+#   'cached_db' - reads from 'sessions' cache, falls back to database on miss, writes to both
+#   'cache' - 'sessions' cache only, no database queries at all
+# Default is 'cached_db' when shared cache is configured, 'db' otherwise - in-memory cache is private to a process, so
+# other workers would read stale sessions from it. Before switching from 'db' to 'cache', run
+#   python manage.py copy_sessions_to_cache
+# so that existing sessions (logins) are not lost.
+# DJANGO_MESSAGE_STORAGE: 'cookie' (default, messages never touch session), 'session' or 'fallback' (cookie, and
+# session for messages which don't fit in cookie).
+# endregion
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+}
+SESSION_ENGINE = SESSION_ENGINES[env('DJANGO_SESSION_ENGINE', default='cached_db' if CACHE_URL else 'db')]
+SESSION_CACHE_ALIAS = 'sessions'
+
+MESSAGE_STORAGES = {
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+    'session': 'django.contrib.messages.storage.session.SessionStorage',
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+}
+MESSAGE_STORAGE = MESSAGE_STORAGES[env('DJANGO_MESSAGE_STORAGE', default='cookie')]
+
+# Random stand-in categories of home page are picked once per rotation window (seconds), so the page is the same, and
+# cached, for the whole window (see home_page.py). Fixed seed pins them for good - the same page on every request, for
+# benchmarks. None (default) picks new ones every window.
+HOME_ROTATION_WINDOW = env.int('DJANGO_HOME_ROTATION_WINDOW', default=60 * 5)
+HOME_RANDOM_SEED = env.int('DJANGO_HOME_RANDOM_SEED', default=None)
 
 LOGIN_URL = 'my_newsapp:login'
 # LOGIN_URL = '/admin/login'
 
 LOGIN_REDIRECT_URL = 'my_newsapp:home'
 
-FILEPROVIDER_NAME = 'python'
+# region file downloads
+# DJANGO_FILEPROVIDER_NAME - who sends downloaded files (see my_newsapp/file_serving.py): 'python' - Django streams
+# them, with Range support; 'nginx' (or 'xaccel') - X-Accel-Redirect to FILE_ACCEL_REDIRECT_PREFIX + file name, an
+# internal nginx location aliased to MEDIA_ROOT; 'apache' (or 'xsendfile') - X-Sendfile with file's path.
+# endregion
+FILEPROVIDER_NAME = env('DJANGO_FILEPROVIDER_NAME', default='python')
+FILE_ACCEL_REDIRECT_PREFIX = env('DJANGO_FILE_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+# seconds for which browser keeps streamed audio (stream_audio view)
+AUDIO_CACHE_MAX_AGE = env.int('DJANGO_AUDIO_CACHE_MAX_AGE', default=60 * 60 * 24)
+
+# region signed media urls
+# With DJANGO_SIGNED_MEDIA_URLS article page links attachments to front web server directly, with urls signed by
+# DJANGO_SIGNED_MEDIA_URL_KEY (shared with the web server) and valid for at least DJANGO_SIGNED_MEDIA_URL_LIFETIME
+# seconds - web server checks them and serves files from MEDIA_ROOT (see my_newsapp/signed_media.py).
+# endregion
+SIGNED_MEDIA_URLS = env.bool('DJANGO_SIGNED_MEDIA_URLS', default=False)
+SIGNED_MEDIA_URL_KEY = env('DJANGO_SIGNED_MEDIA_URL_KEY') if SIGNED_MEDIA_URLS else ''
+SIGNED_MEDIA_URL_PREFIX = env('DJANGO_SIGNED_MEDIA_URL_PREFIX', default='/signed-media/')
+SIGNED_MEDIA_URL_LIFETIME = env.int('DJANGO_SIGNED_MEDIA_URL_LIFETIME', default=60 * 10)
 
 # INTERNAL_IPS = '127.0.0.1'  # debug_toolbar on/off
 
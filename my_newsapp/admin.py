@@ -1,10 +1,9 @@
 from django.contrib import admin
 from django.core.urlresolvers import reverse
 from django.utils.safestring import mark_safe
-from django.db.models import Count, IntegerField, ExpressionWrapper
 from modeltranslation.admin import TranslationAdmin
 
-from .models import Category, Article, Image, File
+from .models import Category, Article, Image, File, Audio
 
 # IMPORTANT:
 # 1. For modeltranslation integration with admin to work, we must put 'modeltranslation' before 'django.contrib.admin'
@@ -33,7 +32,7 @@ class ArticleAdmin(TranslationAdmin): # inheriting from Translation Admin for ad
 
     def author_link(self, obj):
         return mark_safe('<a href="{}">{}</a>'.format(
-            reverse('admin:auth_user_change', args=(obj.author.pk,)),
+            reverse('admin:auth_user_change', args=(obj.author_id,)),
             obj.author
         ))
 
@@ -42,48 +41,32 @@ class ArticleAdmin(TranslationAdmin): # inheriting from Translation Admin for ad
 
     def category_link(self, obj):
         return mark_safe('<a href="{}">{}</a>'.format(
-            reverse('admin:my_newsapp_category_change', args=(obj.category.pk,)),
+            reverse('admin:my_newsapp_category_change', args=(obj.category_id,)),
             obj.category
         ))
     category_link.short_description = 'category'
     category_link.admin_order_field = 'category'
 
+    # comment_count is denormalized number of article's (top-level) comments, so no COUNT query is needed per row
     def comments_link(self, obj):
-        if obj.comments.count() > 0:
+        if obj.comment_count > 0:
             # link to comments list display with filters - owner is obj, type is comments (replies excluded)
             return mark_safe('<a href="{}{}">{}</a>'.format(
                 reverse('admin:comments_comment_changelist'),
                 '?owner={}&type={}'.format(obj.id, 'comments'),
-                '{} Comments'.format(obj.comments.filter(parent=None).count())
+                '{} Comments'.format(obj.comment_count)
             ))
         return 'no Comments'
     comments_link.short_description = 'comments'
-    comments_link.admin_order_field = 'comments_count'
+    comments_link.admin_order_field = 'comment_count'
 
+    # author and category are joined, so author_link and category_link don't query them per row
     def get_queryset(self, request):
         qs = super(ArticleAdmin, self).get_queryset(request)
-        #region
-        #
-        # With annotate we can dynamically create new fields. Here, we use ExpressionWrapper with Count to create new
-        # dynamic field, of type IntegerField, named comments_count, so now we can use it for ordering articles
-        # according number of comments they own (comments_link.admin_order_field = 'comments_count'). Now our queryset
-        # (it is originally Article.object.all() be case we used super()) has new field, dynamically created here, and
-        # we can use it in our admin view.
-        # We can even create new dynamic fields by calculating something from more existing fields, then we have to use
-        # F and ExpressionWrapper. More here:
-        #   https://docs.djangoproject.com/en/1.11/ref/models/expressions/#aggregate-expressions
-        #   https://docs.djangoproject.com/en/1.11/ref/models/expressions/#using-f-with-annotations
-        #
-        #endregion
-        qs = qs.annotate(
-            comments_count=ExpressionWrapper(
-                Count('comments'),
-                output_field=IntegerField()
-            )
-        )
-        return qs.order_by('pub_date')
+        return qs.select_related('author', 'category').order_by('pub_date')
 
 admin.site.register(Article, ArticleAdmin)
 admin.site.register(Category)
 admin.site.register(Image)
 admin.site.register(File)
+admin.site.register(Audio)
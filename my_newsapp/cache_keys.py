@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.utils import translation
+
+# region
+# One key space for everything app stores in cache (navigation tree, cached pages, page cache tags ...).
+#
+# Keys are built from ':'-joined parts. Content which is rendered differently per language (translated fields,
+# i18n_patterns urls) is stored under language_cache_key(), which puts language code from settings.LANGUAGES in front,
+# so the same content in other language never overwrites it. Language independent data uses cache_key().
+#
+# Deploy version is not part of these keys - cache backend adds KEY_PREFIX and VERSION (settings.CACHE_VERSION) to
+# every key itself, so bumping DJANGO_CACHE_VERSION on deploy orphans every key written by the previous release (for
+# example pickled objects whose class has changed) without having to flush Redis.
+# endregion
+KEY_SEPARATOR = ':'
+
+def cache_key(*parts):
+    return KEY_SEPARATOR.join(str(part) for part in parts)
+
+# language which is not in settings.LANGUAGES (or no active language, e.g. in management command) falls back to
+# LANGUAGE_CODE, so there is exactly one key per configured language
+def cache_language(language=None):
+    language = language or translation.get_language()
+    if language not in dict(settings.LANGUAGES):
+        return settings.LANGUAGE_CODE
+    return language
+
+def language_cache_key(*parts, language=None):
+    return cache_key(cache_language(language), *parts)
+
+# keys of the same content in every configured language - for invalidating it
+def language_cache_keys(*parts):
+    return [language_cache_key(*parts, language=language) for language, _ in settings.LANGUAGES]
@@ -0,0 +1,30 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+import binascii
+
+from django.utils.dateparse import parse_datetime
+
+# region
+# (pub_date, id) cursors of keyset pagination - article lists (my_newsapp/pagination.py) and comments
+# (comments/pagination.py) are both ordered newest first, with id breaking ties between objects published at the same
+# time.
+#
+# Cursor is opaque to clients: urlsafe base64 (without padding) of '<pub_date isoformat>|<id>'.
+# endregion
+CURSOR_SEPARATOR = '|'
+
+def encode_cursor(obj):
+    value = '{}{}{}'.format(obj.pub_date.isoformat(), CURSOR_SEPARATOR, obj.id)
+    return urlsafe_b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+# returns (pub_date, id), raises ValueError for cursor which wasn't made by encode_cursor()
+def decode_cursor(cursor):
+    try:
+        value = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        pub_date, id = value.split(CURSOR_SEPARATOR)
+        pub_date = parse_datetime(pub_date)
+        id = int(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor: {}'.format(cursor))
+    if pub_date is None:
+        raise ValueError('Invalid cursor: {}'.format(cursor))
+    return pub_date, id
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.utils import OperationalError
+
+from .cache_keys import cache_key
+
+logger = logging.getLogger(__name__)
+
+# region
+# Pool of database connections, one per database alias in every worker process (see mysql_pool backend).
+#
+# Django opens a new connection for every request (CONN_MAX_AGE = 0) - connect and authentication to MySQL is a big
+# part of short request's time. With the pool, connection Django "closes" at the end of request is returned to the pool
+# instead, and the next request (of any thread of the worker) gets it back without connecting.
+#
+#   SIZE - most connections worker keeps open (in use and idle together). When all of them are in use, checkout waits
+#          for one to be returned, at most WAIT_TIMEOUT seconds, and then fails with PoolTimeout.
+#   IDLE_TIMEOUT - connection idle for longer is closed instead of reused. Keep it below MySQL's wait_timeout, so pool
+#                  doesn't hand out connections server has already dropped.
+#   VALIDATE - ping idle connection on checkout, connection which doesn't answer (server restart, failover) is closed
+#              and the next one (or a new one) is used, so request doesn't fail on a dead connection.
+#
+# Waits for a connection (count and total milliseconds) and wait timeouts are counted in cache, so counters are shared
+# by all workers - see get_counters() and db_pool_counters management command. Waits mean SIZE is smaller than number
+# of threads worker serves requests with. Checkouts, new and discarded connections are counted per pool (stats).
+# endregion
+DB_POOL_DEFAULTS = {
+    'SIZE': 5,
+    'IDLE_TIMEOUT': 300,
+    'WAIT_TIMEOUT': 5,
+    'VALIDATE': True,
+}
+DB_POOL_COUNTER_KEY = 'db_pool_counter'
+DB_POOL_COUNTERS = ('waits', 'wait_ms', 'timeouts')
+
+class PoolTimeout(OperationalError):
+    pass
+
+class ConnectionPool:
+    def __init__(self, connect, size, idle_timeout, wait_timeout, validate=None):
+        self.connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.validate = validate
+        self.idle = [] # (connection, returned at), the most recently returned one last
+        self.open = 0
+        self.condition = threading.Condition()
+        self.stats = Counter()
+
+    def checkout(self):
+        self.count('checkouts')
+        while True:
+            connection = self.reserve()
+            if connection is None:
+                try:
+                    connection = self.connect()
+                except Exception:
+                    self.release()
+                    raise
+                self.count('created')
+                return connection
+            if self.is_valid(connection):
+                return connection
+            self.discard(connection)
+
+    def checkin(self, connection):
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection):
+        self.count('discarded')
+        try:
+            connection.close()
+        except Exception: # connection is already broken
+            pass
+        self.release()
+
+    # returns idle connection or None if caller may open a new one, waits if pool is full. Counters in cache are
+    # incremented after the lock is released, so other threads don't wait for cache round trips.
+    def reserve(self):
+        connection = None
+        with self.condition:
+            started = time.monotonic()
+            waited = timed_out = False
+            while True:
+                self.close_expired()
+                if self.idle:
+                    connection, returned_at = self.idle.pop()
+                    break
+                if self.open < self.size:
+                    self.open += 1
+                    break
+                remaining = started + self.wait_timeout - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                waited = True
+                self.condition.wait(remaining)
+        if timed_out:
+            increment_counter('timeouts')
+            raise PoolTimeout('No database connection available in {} seconds (pool size {}).'.format(
+                self.wait_timeout, self.size))
+        if waited:
+            self.record_wait(time.monotonic() - started)
+        return connection
+
+    def release(self):
+        with self.condition:
+            self.open -= 1
+            self.condition.notify()
+
+    # idle list is ordered by return time, so expired connections are at its start
+    def close_expired(self):
+        now = time.monotonic()
+        while self.idle and now - self.idle[0][1] > self.idle_timeout:
+            connection, returned_at = self.idle.pop(0)
+            self.stats['discarded'] += 1
+            self.open -= 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def is_valid(self, connection):
+        if not self.validate:
+            return True
+        try:
+            self.validate(connection)
+        except Exception:
+            return False
+        return True
+
+    # stats are shared by all threads of the process
+    def count(self, name):
+        with self.condition:
+            self.stats[name] += 1
+
+    def record_wait(self, seconds):
+        self.count('waits')
+        increment_counter('waits')
+        increment_counter('wait_ms', int(seconds * 1000))
+        logger.info('Waited %.3f s for database connection (pool size %s).', seconds, self.size)
+
+# region
+# Pools of this process, by key (database alias and name, see mysql_pool backend). Worker processes forked from
+# a process which has already used the database (gunicorn --preload) must not share its connections, so pools of
+# another process id are dropped - without closing their connections, which would close them for the parent process
+# too.
+# endregion
+pools = {}
+pools_pid = None
+pools_lock = threading.Lock()
+
+# create is called (once per process) to create key's pool if there is none
+def get_pool(key, create):
+    global pools_pid
+    with pools_lock:
+        if pools_pid != os.getpid():
+            pools.clear()
+            pools_pid = os.getpid()
+        if key not in pools:
+            pools[key] = create()
+        return pools[key]
+
+def counter_key(name):
+    return cache_key(DB_POOL_COUNTER_KEY, name)
+
+def increment_counter(name, delta=1):
+    key = counter_key(name)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError: # counter was evicted between add() and incr()
+        cache.add(key, delta, None)
+
+def get_counters():
+    values = cache.get_many([counter_key(name) for name in DB_POOL_COUNTERS])
+    return {name: values.get(counter_key(name), 0) for name in DB_POOL_COUNTERS}
+
+def reset_counters():
+    cache.delete_many([counter_key(name) for name in DB_POOL_COUNTERS])
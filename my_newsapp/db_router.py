@@ -0,0 +1,72 @@
+import random
+import threading
+
+from django.conf import settings
+
+# region
+# Read replicas (settings.DATABASE_REPLICAS - aliases from settings.DATABASES, see DATABASE_REPLICA_HOSTS in
+# settings.py).
+#
+# Only reads of views marked as safe - read-only GET views, replica_reads = True on class based views, @replica_reads on
+# function views - go to a replica, picked at random once per request, so all reads of the request see the same state of
+# data (replicas don't lag behind primary by the same amount). Everything else, and every write, uses primary
+# ('default'). Replicas lag behind primary, so after user writes something (comment, article edit, login...) response
+# sets REPLICA_STICKY_COOKIE and user's reads stay on primary for settings.REPLICA_STICKY_SECONDS - long enough for
+# replicas to catch up - so user always sees what they have just written.
+#
+# Routing state is per request (thread local), set by ReplicaRoutingMiddleware. Outside of requests (management
+# commands, shell, tests) everything uses primary. Values which are cached for all requests (navigation tree, category
+# ids) are always rebuilt from primary - with .using('default') - as value read from a lagging replica would stay in
+# cache until its timeout, long after replica has caught up.
+# endregion
+REPLICA_STICKY_COOKIE = 'primary_reads'
+
+state = threading.local()
+
+def replica_reads(view):
+    view.replica_reads = True
+    return view
+
+def is_replica_view(view_func):
+    view_class = getattr(view_func, 'view_class', None) # class based view's as_view()
+    return getattr(view_class or view_func, 'replica_reads', False)
+
+# replica reads of current request go to, None if they go to primary
+def current_replica():
+    return getattr(state, 'replica', None)
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica() or 'default'
+
+    def db_for_write(self, model, **hints):
+        state.wrote = True
+        return 'default'
+
+    # replicas hold the same data as primary
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state.replica = None
+        state.wrote = False
+        try:
+            response = self.get_response(request)
+            if state.wrote:
+                response.set_cookie(REPLICA_STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True)
+            return response
+        finally:
+            state.replica = None
+            state.wrote = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replicas = (settings.DATABASE_REPLICAS and request.method in ('GET', 'HEAD') and is_replica_view(view_func)
+                        and REPLICA_STICKY_COOKIE not in request.COOKIES)
+        state.replica = random.choice(settings.DATABASE_REPLICAS) if use_replicas else None
@@ -0,0 +1,139 @@
+import os
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, FileResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from fileprovider.middleware import PROVIDERS, XAccelFileProvider
+
+# region
+# Serving of uploaded files (article attachments) - file is never read into memory.
+#
+# FILEPROVIDER_NAME 'python' (default, see settings.py): Django streams the file itself, FILE_BLOCK_SIZE at a time.
+# Whole file is FileResponse of the open file, so WSGI server's wsgi.file_wrapper (gunicorn) sends it with
+# os.sendfile(). Range requests (resumed downloads, seeking) get 206 with the requested bytes - single range only,
+# request for more ranges gets the whole file (RFC 7233 allows server to ignore Range). If-Range which doesn't match
+# file's ETag or Last-Modified (file has changed since the first part was downloaded) gets the whole file too.
+# If-None-Match/If-Modified-Since which match the file get 304, so files cached by browser aren't sent again.
+#
+# Other providers offload the transfer to front web server, which handles Range itself. Response only carries headers
+# and X-File, which fileprovider.middleware.FileProviderMiddleware turns into:
+#   X-Accel-Redirect (nginx, caddy) - FILE_ACCEL_REDIRECT_PREFIX + file's storage name, an internal location which
+#                                     nginx maps to MEDIA_ROOT
+#   X-Sendfile (apache, lighttpd) - file's path
+#
+# Content type is the one stored with the file (File.mime_type) - nothing is detected while serving.
+# endregion
+FILE_BLOCK_SIZE = 64 * 1024
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def is_offloaded():
+    return settings.FILEPROVIDER_NAME != 'python'
+
+# returns (first, last) byte of the range in Range header, or None if file should be served whole. Raises ValueError
+# for range which is not satisfiable (416).
+def parse_range(header, size):
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    if size == 0:
+        raise ValueError('Empty file has no satisfiable range.')
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # suffix range - the last N bytes
+        if int(last) == 0:
+            raise ValueError('Empty suffix range.')
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError('Range starts after the end of file.')
+    return first, min(int(last), size - 1) if last else size - 1
+
+def file_etag(stat):
+    return '"{:x}-{:x}"'.format(stat.st_size, int(stat.st_mtime))
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    return if_range is None or if_range in (etag, last_modified)
+
+# file-like object of the part of file from its current position, FileResponse reads it until it returns b''. Has no
+# fileno(), so it is never handed to sendfile, which would send the file to its end.
+class FileRange:
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+def offload_response(path, name, content_type):
+    if not os.path.isfile(path):
+        raise Http404
+    response = HttpResponse(content_type=content_type)
+    if issubclass(PROVIDERS[settings.FILEPROVIDER_NAME], XAccelFileProvider):
+        response['X-File'] = settings.FILE_ACCEL_REDIRECT_PREFIX + name
+    else:
+        response['X-File'] = path
+    return response
+
+def stream_response(request, path, content_type):
+    try:
+        file = open(path, 'rb')
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404
+    stat = os.fstat(file.fileno())
+    etag, last_modified = file_etag(stat), http_date(stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        file.close()
+        return not_modified
+
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], stat.st_size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(stat.st_size)
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = stat.st_size
+    else:
+        first, last = byte_range
+        file.seek(first)
+        response = FileResponse(FileRange(file, last - first + 1), status=206, content_type=content_type)
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, stat.st_size)
+    response.block_size = FILE_BLOCK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
+# path - file's path in MEDIA_ROOT, name - its storage name (FieldFile.name)
+def serve_file(request, path, name, content_type, disposition='inline'):
+    content_type = content_type or 'application/octet-stream'
+    if is_offloaded():
+        response = offload_response(path, name, content_type)
+    else:
+        response = stream_response(request, path, content_type)
+    if response.status_code in (200, 206):
+        response['Content-Disposition'] = '{}; filename={}'.format(disposition, os.path.basename(name))
+    return response
@@ -0,0 +1,97 @@
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q, Prefetch
+from django.utils import timezone
+
+from .models import Category, Article, Image
+from .utils import get_status_none_categories_random_ids
+
+# region
+# Assembles home page context with fixed number of queries, no matter how many categories and articles there are:
+#   1. ids of categories without status (cached, see utils) - two random ones are sampled in python
+#   2. primary and secondary category - or sampled categories standing in for them, if there are none - together
+#   3. primary category articles, 4. their images (prefetch), 5. secondary category articles, 6. other articles
+# Articles are fetched with their category and author (select_related), as get_absolute_url() needs category slug.
+# Only primary articles are shown with thumbnail, so only they get images - first one is set as article.cover_image.
+# endregion
+HOME_PRIMARY_ARTICLES = 3
+HOME_SECONDARY_ARTICLES = 2
+HOME_OTHER_ARTICLES = 6
+
+# region
+# Rotation of random stand-in categories. Time is split into windows of settings.HOME_ROTATION_WINDOW seconds, and
+# window's number is the seed of random choice - so every request (in every worker) within a window renders the same
+# home page, which can be cached until the window ends (see HomeView), and the next window shows new categories.
+# Nothing has to be stored or coordinated between workers. settings.HOME_RANDOM_SEED, when set, pins the choice.
+# endregion
+# the moment request's rotation is computed for - HomeView takes it once, before rendering, so seed, page cache timeout
+# and validators of the page all belong to the same window even if rendering crosses window's end
+def rotation_now():
+    return time.time()
+
+def rotation_window(now=None):
+    return int((time.time() if now is None else now) // settings.HOME_ROTATION_WINDOW)
+
+def rotation_started_at(now=None):
+    return datetime.fromtimestamp(rotation_window(now) * settings.HOME_ROTATION_WINDOW, timezone.utc)
+
+def rotation_seconds_left(now=None):
+    now = time.time() if now is None else now
+    return (rotation_window(now) + 1) * settings.HOME_ROTATION_WINDOW - now
+
+def rotation_seed(now=None):
+    if settings.HOME_RANDOM_SEED is not None:
+        return settings.HOME_RANDOM_SEED
+    return rotation_window(now)
+
+def home_articles():
+    return Article.objects.select_related('category', 'author')
+
+def get_home_categories(rand_ids):
+    # primary/secondary which don't exist are replaced with categories popped from the end of rand_ids
+    categories = list(Category.objects.filter(Q(status__in=('P', 'S')) | Q(id__in=rand_ids[-2:])))
+    by_status = {category.status: category for category in categories if category.status}
+    by_id = {category.id: category for category in categories}
+    primary = by_status.get('P') or (by_id.get(rand_ids.pop()) if rand_ids else None)
+    secondary = by_status.get('S') or (by_id.get(rand_ids.pop()) if rand_ids else None)
+    return primary, secondary
+
+def get_primary_articles(category):
+    if category is None:
+        return []
+    articles = list(home_articles().filter(category=category)
+                    .prefetch_related(Prefetch('images', queryset=Image.objects.order_by('id')))
+                    [:HOME_PRIMARY_ARTICLES])
+    for article in articles:
+        images = article.images.all()
+        article.cover_image = images[0] if images else None
+    return articles
+
+def get_secondary_articles(category):
+    if category is None:
+        return []
+    return list(home_articles().filter(category=category)[:HOME_SECONDARY_ARTICLES])
+
+# Latest articles of categories without status, except those standing in for primary/secondary category (exclude_ids).
+# Returns empty QuerySet if there are no such articles.
+def get_other_articles(exclude_ids=()):
+    return (home_articles().filter(category__status=None)
+            .exclude(category_id__in=exclude_ids)[:HOME_OTHER_ARTICLES])
+
+# seed makes random choice of stand-in categories repeatable (defaults to current rotation's seed)
+def assemble_home_page(seed=None):
+    if seed is None:
+        seed = rotation_seed()
+    rand_ids = get_status_none_categories_random_ids(count=2, seed=seed)
+    primary_category, secondary_category = get_home_categories(rand_ids)
+    stand_in_ids = [category.id for category in (primary_category, secondary_category)
+                    if category is not None and category.status is None]
+    return {
+        'primary_category': primary_category,
+        'primary_articles': get_primary_articles(primary_category),
+        'secondary_category': secondary_category,
+        'secondary_articles': get_secondary_articles(secondary_category),
+        'other_articles': get_other_articles(stand_in_ids),
+    }
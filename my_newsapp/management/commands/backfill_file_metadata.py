@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from my_newsapp.models import File
+
+# region
+# File.mime_type, icon and size are detected when file is uploaded. Files uploaded before those fields existed (or
+# which were replaced on disk) get them filled in by this command. Rows are updated with queryset update(), so
+# backfill doesn't touch articles' updated_at nor purge cached pages.
+# Usage:
+#   python manage.py backfill_file_metadata [--all]
+# endregion
+class Command(BaseCommand):
+    help = 'Detects and stores MIME type, icon and size of uploaded files which do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Detect metadata again for every file.')
+
+    def handle(self, *args, **options):
+        files = File.objects.exclude(file='').exclude(file=None)
+        if not options['all']:
+            files = files.filter(mime_type='')
+
+        updated = missing = 0
+        for file in files.iterator():
+            try:
+                file.detect_metadata()
+            except (IOError, OSError):
+                missing += 1
+                self.stderr.write('{} (id={}) is missing from storage'.format(file.file.name, file.id))
+                continue
+            finally:
+                file.file.close()
+            File.objects.filter(pk=file.pk).update(mime_type=file.mime_type, icon=file.icon, size=file.size)
+            updated += 1
+        self.stdout.write('{} files updated, {} missing'.format(updated, missing))
@@ -0,0 +1,32 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+# region
+# Migration path from 'db' to 'cache' session engine: copies every unexpired session from django_session table to
+# cache configured by SESSION_CACHE_ALIAS, under the key SESSION_ENGINE's store reads it from and with the same expiry
+# it has in database, so users stay logged in after the switch. Run it right after deploying with
+# DJANGO_SESSION_ENGINE=cache (sessions created in between by 'db' engine are not copied, run it again if needed).
+# With 'cached_db' engine it only warms up the cache, as sessions are read from database on cache miss anyway.
+# Usage:
+#   python manage.py copy_sessions_to_cache
+# endregion
+class Command(BaseCommand):
+    help = 'Copies unexpired database sessions to session cache.'
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        if not hasattr(engine.SessionStore, 'cache_key_prefix'):
+            raise CommandError('SESSION_ENGINE {} is not cache based.'.format(settings.SESSION_ENGINE))
+
+        now = timezone.now()
+        copied = 0
+        for session in Session.objects.filter(expire_date__gt=now).iterator():
+            store = engine.SessionStore(session.session_key)
+            timeout = int((session.expire_date - now).total_seconds())
+            store._cache.set(store.cache_key, session.get_decoded(), timeout)
+            copied += 1
+        self.stdout.write('{} sessions copied to cache'.format(copied))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from my_newsapp.db_pool import get_counters, reset_counters
+
+# region
+# Prints how many times requests waited for a database connection because all connections of worker's pool were in
+# use (waits), how long they waited altogether (wait_ms) and how many of them gave up (timeouts), counted by all
+# workers since last reset.
+# Usage:
+#   python manage.py db_pool_counters [--reset]
+# endregion
+class Command(BaseCommand):
+    help = 'Prints database connection pool wait counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset counters after printing them.')
+
+    def handle(self, *args, **options):
+        for name, value in get_counters().items():
+            self.stdout.write('{}: {}'.format(name, value))
+        if options['reset']:
+            reset_counters()
@@ -0,0 +1,105 @@
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from comments.models import Comment
+from comments.pagination import COMMENTS_PAGE_SIZE
+from my_newsapp.home_page import HOME_PRIMARY_ARTICLES
+from my_newsapp.models import Category, Article
+
+# region
+# Runs EXPLAIN on queries of the hottest pages and fails if any of them reads a whole table instead of using an index:
+#   latest and category article lists (keyset pages), article detail (lookup by slug), home page categories (status),
+#   page of article's comments and their replies.
+# Query plans depend on data, so queries are explained with values (slug, category, article with comments) taken from
+# the database. On empty or tiny database (development, CI) use --seed, which creates N articles with comments first,
+# and rolls them back when done:
+#   python manage.py explain_hot_queries [--seed N] [-v 2]
+# Supports MySQL (EXPLAIN, full scan is access type ALL) and SQLite (EXPLAIN QUERY PLAN, full scan is SCAN without
+# index). Scan in index order (MySQL access type index) is not reported - article lists read index that way, and stop
+# after LIMIT rows.
+# endregion
+EXPLAIN_PREFIXES = {
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+SEED_CATEGORIES = 10
+SEED_COMMENTS_PER_ARTICLE = 3
+
+class Command(BaseCommand):
+    help = 'Explains hot path queries and fails if any of them does a full table scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, metavar='N',
+                            help='Create N articles with comments before explaining (rolled back afterwards).')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in EXPLAIN_PREFIXES:
+            raise CommandError('EXPLAIN is not supported for {} database.'.format(connection.vendor))
+
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            full_scans = [name for name, queryset in self.get_hot_queries()
+                          if self.report(name, self.explain(queryset), options['verbosity'])]
+            transaction.set_rollback(bool(options['seed']))
+
+        if full_scans:
+            raise CommandError('Full table scan in: {}'.format(', '.join(full_scans)))
+
+    def get_hot_queries(self):
+        article = Article.objects.exclude(comment_count=0).first() or Article.objects.first()
+        if article is None:
+            raise CommandError('There are no articles to explain queries with. Run with --seed.')
+        comment_ids = list(Comment.objects.top_level(ContentType.objects.get_for_model(Article), article.id)
+                           .values_list('id', flat=True)[:COMMENTS_PAGE_SIZE]) or [0]
+        return [
+            ('latest articles', Article.objects.order_by('-pub_date', '-id')[:HOME_PRIMARY_ARTICLES + 1]),
+            ('category articles', Article.objects.filter(category_id=article.category_id)
+                .order_by('-pub_date', '-id')[:HOME_PRIMARY_ARTICLES + 1]),
+            ('article detail', Article.objects.filter(slug=article.slug)),
+            ('home categories', Category.objects.filter(status__in=('P', 'S'))),
+            ('comments page', Comment.objects.top_level(ContentType.objects.get_for_model(Article), article.id)
+                .order_by('-pub_date', '-id')[:COMMENTS_PAGE_SIZE + 1]),
+            ('comment replies', Comment.objects.filter(parent_id__in=comment_ids)),
+        ]
+
+    # returns query plan as list of dicts (column: value), one per plan row
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN_PREFIXES[connection.vendor] + sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def is_full_scan(self, row):
+        if connection.vendor == 'mysql':
+            return row['type'] == 'ALL'
+        return row['detail'].startswith('SCAN') and 'INDEX' not in row['detail']
+
+    # writes query's plan and returns True if it has full table scan
+    def report(self, name, plan, verbosity):
+        full_scan = any(self.is_full_scan(row) for row in plan)
+        self.stdout.write('{}: {}'.format(name, 'FULL TABLE SCAN' if full_scan else 'ok'))
+        if full_scan or verbosity > 1:
+            for row in plan:
+                self.stdout.write('    {}'.format(row))
+        return full_scan
+
+    def seed(self, count):
+        author, created = User.objects.get_or_create(username='explain-hot-queries-seed')
+        categories = [Category.objects.create(title='Seed category {}'.format(n), image='seed.jpg')
+                      for n in range(SEED_CATEGORIES)]
+        Article.objects.bulk_create(
+            Article(title='Seed article {}'.format(n), text='Seed', short_description='Seed', author=author,
+                    category=categories[n % SEED_CATEGORIES])
+            for n in range(count)
+        )
+        content_type = ContentType.objects.get_for_model(Article)
+        Comment.objects.bulk_create(
+            Comment(text='Seed', author=author, content_type=content_type, object_id=article_id)
+            for article_id in Article.objects.filter(author=author).values_list('id', flat=True)
+            for n in range(SEED_COMMENTS_PER_ARTICLE)
+        )
+        Article.objects.filter(author=author).update(comment_count=SEED_COMMENTS_PER_ARTICLE)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from my_newsapp.stale_cache import get_counters, reset_counters
+
+# region
+# Prints how many times requests waited for another request to recompute cache entry (lock_waits) and how many
+# times they got stale entry meanwhile (stale_serves), counted by all workers since last reset.
+# Usage:
+#   python manage.py stale_cache_counters [--reset]
+# endregion
+class Command(BaseCommand):
+    help = 'Prints stale cache lock wait and stale serve counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset counters after printing them.')
+
+    def handle(self, *args, **options):
+        for name, value in get_counters().items():
+            self.stdout.write('{}: {}'.format(name, value))
+        if options['reset']:
+            reset_counters()
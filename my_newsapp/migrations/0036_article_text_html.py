@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.17 on 2026-10-18 18:29
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.utils.html import linebreaks
+
+LANGUAGES = ('en', 'hr')
+
+def render_text_html(apps, schema_editor):
+    Article = apps.get_model('my_newsapp', 'Article')
+    for article in Article.objects.iterator():
+        article.text_html = linebreaks(article.text, autoescape=True)
+        for language in LANGUAGES:
+            text = getattr(article, f'text_{language}')
+            setattr(article, f'text_html_{language}', linebreaks(text, autoescape=True) if text else text)
+        article.save(update_fields=['text_html'] + [f'text_html_{language}' for language in LANGUAGES])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_newsapp', '0035_auto_20190227_2221'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='text_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='text_html_en',
+            field=models.TextField(default='', editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='text_html_hr',
+            field=models.TextField(default='', editable=False, null=True),
+        ),
+        migrations.RunPython(render_text_html, migrations.RunPython.noop),
+    ]
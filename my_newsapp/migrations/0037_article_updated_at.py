@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.17 on 2026-10-18 18:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# existing articles were last modified (as far as we know) when they were published
+def set_updated_at(apps, schema_editor):
+    Article = apps.get_model('my_newsapp', 'Article')
+    Article.objects.update(updated_at=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_newsapp', '0036_article_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(set_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.17 on 2026-10-18 18:35
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+def count_comments(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Article = apps.get_model('my_newsapp', 'Article')
+    Comment = apps.get_model('comments', 'Comment')
+    content_type = ContentType.objects.filter(app_label='my_newsapp', model='article').first()
+    if content_type is None: # fresh database, there are no comments yet
+        return
+    counts = (Comment.objects.filter(content_type=content_type, parent__isnull=True)
+              .values_list('object_id').annotate(count=models.Count('id')).order_by())
+    for article_id, count in counts:
+        Article.objects.filter(pk=article_id).update(comment_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('comments', '0014_comment_reply_count'),
+        ('my_newsapp', '0037_article_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
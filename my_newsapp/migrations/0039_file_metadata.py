@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.17 on 2026-10-18 18:37
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_newsapp', '0038_article_comment_count'),
+    ]
+
+    # existing files are filled in by backfill_file_metadata management command
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='icon',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='mime_type',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='size',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+    ]
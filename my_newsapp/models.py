@@ -4,8 +4,11 @@ from django.urls import reverse
 from django.contrib.contenttypes.fields import GenericRelation
 from django.core.validators import FileExtensionValidator
 from django.conf import settings
+from django.utils.html import linebreaks
 
 from autoslug import AutoSlugField
+from modeltranslation.settings import AVAILABLE_LANGUAGES
+from modeltranslation.utils import build_localized_fieldname
 
 from comments.models import Comment
 
@@ -49,11 +52,35 @@ class Article(models.Model):
     title = models.CharField(max_length=100, unique=True)
     slug = AutoSlugField(null=True, default=None, populate_from='title')
     text = models.TextField()
+    # text rendered with linebreaks on save (see render_text_html()), so detail page can output it as it is
+    text_html = models.TextField(default='', editable=False)
     short_description = models.TextField(max_length=300)
     pub_date = models.DateTimeField(auto_now_add=True)
+    # bumped on every change of article itself and of its images, files and comments (see signals.py). Used for
+    # conditional GET (ETag/Last-Modified) in views.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     author = models.ForeignKey(User, related_name='articles', on_delete=models.DO_NOTHING)
     category = models.ForeignKey(Category, related_name='articles', on_delete=models.CASCADE)
     comments = GenericRelation(Comment)
+    # denormalized number of (top-level) comments, maintained by Comment.update_counts()
+    comment_count = models.PositiveIntegerField(default=0)
+
+    # comment_count is maintained with UPDATEs by Comment.update_counts(), so saving existing article (edit view,
+    # admin) leaves it out - value loaded with the article may be stale and would overwrite concurrent increments
+    def save(self, *args, **kwargs):
+        self.render_text_html()
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'comment_count']
+        super().save(*args, **kwargs)
+
+    # Renders text of every translation language (text_en, text_hr...) into corresponding text_html field. Same as
+    # {{ article.text|linebreaks }} in template, but done once on write instead of on every page view.
+    def render_text_html(self):
+        for language in AVAILABLE_LANGUAGES:
+            text = getattr(self, build_localized_fieldname('text', language))
+            text_html = linebreaks(text, autoescape=True) if text else text
+            setattr(self, build_localized_fieldname('text_html', language), text_html)
 
     def get_absolute_url(self):
         return reverse(
@@ -66,6 +93,16 @@ class Article(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        # keyset pagination of latest and category articles (see pagination.py)
+        indexes = [
+            models.Index(fields=['pub_date', 'id'], name='article_pub_date_id_idx'),
+            models.Index(fields=['category', 'pub_date', 'id'], name='article_category_pub_date_idx'),
+        ] + [
+            # slug is not unique, but ArticleDetailView looks article up by it - in current language's slug column
+            models.Index(fields=[build_localized_fieldname('slug', language)],
+                         name='article_slug_{}_idx'.format(language))
+            for language in AVAILABLE_LANGUAGES
+        ]
 
 class Image(models.Model):
     image = models.ImageField(
@@ -87,6 +124,10 @@ class File(models.Model):
         null=True
     )
     article = models.ForeignKey(Article, related_name='files', on_delete=models.CASCADE)
+    # detected once, when file is uploaded (see save()), so rendering and downloading never call libmagic or stat file
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    icon = models.CharField(max_length=100, blank=True, editable=False)
+    size = models.PositiveIntegerField(null=True, editable=False)
 
     CONTENT_TYPE_ICON_PAIRS = (
         ('application/pdf', 'pdf.png'),
@@ -98,17 +139,35 @@ class File(models.Model):
         ('application/vnd.ms-excel', 'xls_xlsx.png'),
         ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xls_xlsx.png'),
     )
+    # libmagic's default bytes_max - it never looks further than this into a file
+    MIME_DETECTION_BUFFER_SIZE = 1024 * 1024
 
-    def get_type_icon(self):
-        for pair in self.CONTENT_TYPE_ICON_PAIRS:
-            content_type, icon = pair
-            if content_type == self.content_type():
+    # file which is not committed is a new upload (FileFormSet, admin), not yet written to storage
+    def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            self.detect_metadata()
+        super(File, self).save(*args, **kwargs)
+
+    def detect_metadata(self):
+        from magic import Magic
+        self.file.open('rb')
+        self.mime_type = Magic(mime=True).from_buffer(self.file.read(self.MIME_DETECTION_BUFFER_SIZE))
+        self.file.seek(0)
+        self.icon = self.type_icon(self.mime_type)
+        self.size = self.file.size
+
+    @classmethod
+    def type_icon(cls, mime_type):
+        for content_type, icon in cls.CONTENT_TYPE_ICON_PAIRS:
+            if content_type == mime_type:
                 return f'my_newsapp/file_type_icons/{icon}'
+        return ''
+
+    def get_type_icon(self):
+        return self.icon or None
 
     def content_type(self):
-        from magic import Magic
-        mime = Magic(mime=True)
-        return mime.from_file(self.path())
+        return self.mime_type
 
     def path(self):
         return f'{settings.MEDIA_ROOT}{str(self.file)}'
@@ -129,5 +188,22 @@ class Audio(models.Model):
     )
     article = models.ForeignKey(Article, related_name='audios', on_delete=models.CASCADE)
 
+    # only mp3 and wav files are accepted, so content type follows from extension
+    CONTENT_TYPES = {
+        'mp3': 'audio/mpeg',
+        'wav': 'audio/wav',
+    }
+
+    def content_type(self):
+        return self.CONTENT_TYPES.get(str(self.audio).rsplit('.', 1)[-1].lower(), 'application/octet-stream')
+
+    def path(self):
+        return f'{settings.MEDIA_ROOT}{str(self.audio)}'
+
     def __str__(self):
         return str(self.audio).split('/')[-1]
+
+# connects signal receivers which keep cached navigation tree, cached pages, cached category ids (utils) and
+# Article.updated_at in sync with model changes. Imported here (at the bottom, after models are defined) as app's
+# AppConfig is not used, so there is no ready() to import them in.
+from . import navigation, page_cache, signals, utils  # noqa
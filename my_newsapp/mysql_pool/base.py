@@ -0,0 +1,45 @@
+from functools import partial
+
+from django.db.backends.mysql import base
+
+from my_newsapp.db_pool import ConnectionPool, DB_POOL_DEFAULTS, get_pool
+
+# region
+# django.db.backends.mysql with pooled connections (see my_newsapp/db_pool.py), ENGINE 'my_newsapp.mysql_pool'. Pool is
+# configured by POOL dict of the database's settings (see DATABASE_POOL in settings.py).
+#
+# Connection is checked out of the pool instead of connecting, and returned to it instead of closing - unless it is in
+# the middle of transaction, not in autocommit mode or it had an error, then it is really closed, so next request never
+# gets connection in unknown state.
+# endregion
+def ping(connection):
+    connection.ping()
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    # test database is the same alias with another name, it must not get connections to the real one
+    def get_pool(self):
+        return get_pool((self.alias, self.settings_dict['NAME']), self.create_pool)
+
+    def create_pool(self):
+        options = dict(DB_POOL_DEFAULTS, **self.settings_dict.get('POOL', {}))
+        return ConnectionPool(
+            partial(base.DatabaseWrapper.get_new_connection, self, self.get_connection_params()),
+            size=options['SIZE'],
+            idle_timeout=options['IDLE_TIMEOUT'],
+            wait_timeout=options['WAIT_TIMEOUT'],
+            validate=ping if options['VALIDATE'] else None,
+        )
+
+    # connection parameters are the same for every connection of the alias, pool got them when it was created
+    def get_new_connection(self, conn_params):
+        return self.get_pool().checkout()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.get_pool()
+        if self.in_atomic_block or not self.autocommit or self.errors_occurred:
+            pool.discard(self.connection)
+        else:
+            pool.checkin(self.connection)
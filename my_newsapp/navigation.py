@@ -0,0 +1,58 @@
+from itertools import groupby
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache_keys import language_cache_key, language_cache_keys
+from .stale_cache import get_or_recompute
+from .models import Article, Category
+
+# Navigation tree is cached per language, because article titles and slugs are translated (modeltranslation) and
+# i18n_patterns prefixes every url with language code. Tree is invalidated on every Article/Category change (see
+# receiver below), timeout is here just as a safety net for changes which bypass signals (queryset.update() etc.)
+NAVIGATION_CACHE_KEY = 'navigation_tree'
+NAVIGATION_CACHE_TIMEOUT = 60 * 60
+NAVIGATION_CACHE_HARD_TIMEOUT = 60 * 60 * 24
+
+def navigation_cache_key(language=None):
+    return language_cache_key(NAVIGATION_CACHE_KEY, language=language)
+
+# region
+# Returns list of plain dicts (picklable, so it can be stored in any cache backend):
+#
+#   [{'title': 'Sport', 'url': '/en/sport/', 'articles': [{'title': '...', 'url': '/en/sport/1/some-slug/'}, ...]}, ...]
+#
+# Only categories which have articles are included (same as {% if category.articles.all %} check in template did
+# before). Everything is fetched with one query - articles are ordered by category, and then grouped in python.
+# Only fields navigation needs are fetched (.only() - modeltranslation adds the translated columns of title and slug),
+# so text, its rendered html and short description, in every language, stay in the database. Tree is read from
+# primary, even in requests which read from a replica (see db_router.py).
+# endregion
+def build_navigation_tree():
+    articles = (Article.objects.using('default').select_related('category')
+                .only('title', 'slug', 'pub_date', 'category__title', 'category__slug', 'category__status')
+                .order_by('category_id', '-pub_date'))
+    tree = []
+    for category, category_articles in groupby(articles, key=lambda article: article.category):
+        tree.append({
+            'title': category.title,
+            'url': category.get_absolute_url(),
+            'articles': [{'title': article.title, 'url': article.get_absolute_url()} for article in category_articles]
+        })
+    return tree
+
+# after timeout, tree is rebuilt by one request while others get the old one (see stale_cache.py)
+def get_navigation_tree():
+    return get_or_recompute(navigation_cache_key(), build_navigation_tree,
+                            NAVIGATION_CACHE_TIMEOUT, NAVIGATION_CACHE_HARD_TIMEOUT)
+
+def invalidate_navigation_tree():
+    cache.delete_many(language_cache_keys(NAVIGATION_CACHE_KEY))
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def navigation_changed(sender, **kwargs):
+    invalidate_navigation_tree()
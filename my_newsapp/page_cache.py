@@ -0,0 +1,183 @@
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from comments.models import Comment
+from .cache_keys import cache_key, language_cache_key
+from .db_router import current_replica
+from .models import Article, Category, Image, File, Audio
+from .stale_cache import get_entry, is_fresh, set_entry, recompute_lock, wait_for_entry, increment_counter
+
+# region
+# Full-page cache for anonymous GET requests.
+#
+# Cached page is stored under a key built from active language and request's full path, so i18n_patterns language
+# prefix and query string (?page=) are both part of the key. Every cached page carries tags ('nav', 'article:<id>',
+# 'category:<slug>' ...) together with versions those tags had when page was rendered. Purging a tag just gives it a
+# new version, so every page stored with the old one is stale on next read - there is no need to keep
+# track of which keys belong to which tag. Tag version that was evicted from cache gets a new one on next read too,
+# so eviction can never resurrect a stale page.
+#
+# As navigation (which lists every category and article) is rendered on every page, all pages carry 'nav' tag, and
+# every Article/Category change purges it. Comments, images, files and audios only purge page of article they belong
+# to.
+#
+# With read replicas (see db_router.py), page rendered right after its tag was purged may have been rendered from a
+# replica which doesn't have the change yet - storing it under the new version would cache the old content until
+# timeout. So purge also marks tags as recently purged for REPLICA_STICKY_SECONDS (the time replicas are given to catch
+# up), and page rendered from a replica while any of its tags is marked is returned, but not stored.
+# endregion
+PAGE_CACHE_KEY = 'page'
+PAGE_CACHE_TAG_KEY = 'page_tag'
+PAGE_CACHE_PURGED_TAG_KEY = 'page_tag_purged'
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_HARD_TIMEOUT = 60 * 60
+
+def page_cache_key(request):
+    path_hash = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return language_cache_key(PAGE_CACHE_KEY, path_hash)
+
+# tags are shared by all languages - article change has to purge its page in every language
+def page_cache_tag_key(tag):
+    return cache_key(PAGE_CACHE_TAG_KEY, tag)
+
+def tag_versions(tags):
+    keys = {page_cache_tag_key(tag): tag for tag in tags}
+    versions = {keys[key]: version for key, version in cache.get_many(list(keys)).items()}
+    for key, tag in keys.items():
+        if tag not in versions:
+            # add() doesn't overwrite version set by concurrent request in the meantime, so we read it again
+            cache.add(key, uuid4().hex, None)
+            versions[tag] = cache.get(key)
+    return versions
+
+def page_cache_purged_tag_key(tag):
+    return cache_key(PAGE_CACHE_PURGED_TAG_KEY, tag)
+
+def purge_page_cache_tags(*tags):
+    cache.set_many({page_cache_tag_key(tag): uuid4().hex for tag in tags}, None)
+    if settings.DATABASE_REPLICAS:
+        cache.set_many({page_cache_purged_tag_key(tag): True for tag in tags}, settings.REPLICA_STICKY_SECONDS)
+
+def is_recently_purged(tags):
+    return bool(cache.get_many([page_cache_purged_tag_key(tag) for tag in tags]))
+
+def cached_page_response(entry, status):
+    page = entry['value']
+    response = HttpResponse(page['content'], content_type=page['content_type'])
+    response['X-Page-Cache'] = status
+    return response
+
+def is_fresh_page(entry):
+    return is_fresh(entry) and tag_versions(entry['value']['tags']) == entry['value']['tags']
+
+def set_cached_page(key, response, versions, soft_timeout=PAGE_CACHE_TIMEOUT, hard_timeout=PAGE_CACHE_HARD_TIMEOUT):
+    page = {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'tags': versions,
+    }
+    set_entry(key, page, soft_timeout, hard_timeout)
+
+# region
+# Page is rendered by one request at a time (see stale_cache.py). While it is being rendered, others wait for it - or,
+# in views with page_cache_serve_stale (pages which are expensive to render, like home and category pages), get the
+# page which expired or whose tag was purged, marked with 'X-Page-Cache: STALE'.
+# Template response is rendered here (and not later, by handler) so that lock is held until page is stored.
+# endregion
+class PageCacheMixin:
+    page_cache_tags = ('nav',)
+    page_cache_serve_stale = False
+    page_cache_timeout = PAGE_CACHE_TIMEOUT
+
+    def get_page_cache_tags(self):
+        return list(self.page_cache_tags)
+
+    # seconds for which cached page is fresh
+    def get_page_cache_timeout(self):
+        return self.page_cache_timeout
+
+    def is_page_cacheable(self, request):
+        return request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = page_cache_key(request)
+        entry = get_entry(key)
+        if is_fresh_page(entry):
+            return cached_page_response(entry, 'HIT')
+
+        with recompute_lock(key) as acquired:
+            if acquired:
+                return self.render_page(key, request, *args, **kwargs)
+
+        if entry is not None and self.page_cache_serve_stale:
+            increment_counter('stale_serves')
+            return cached_page_response(entry, 'STALE')
+
+        entry = wait_for_entry(key)
+        if is_fresh_page(entry):
+            return cached_page_response(entry, 'HIT')
+        return self.render_page(key, request, *args, **kwargs)
+
+    # page rendered from a replica which may not have the change that purged it yet
+    def is_replica_page_stale(self):
+        return current_replica() is not None and is_recently_purged(self.get_page_cache_tags())
+
+    def render_page(self, key, request, *args, **kwargs):
+        # versions are read before rendering, so purge which happens while page is rendered is not lost. Timeout is
+        # taken before rendering too - page whose content depends on time (HomeView) is stored for the time of the
+        # content it was rendered with, not the time rendering finished.
+        versions = tag_versions(self.get_page_cache_tags())
+        timeout = self.get_page_cache_timeout()
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, 'render'):
+                response.render()
+            # page which issued csrf token (or set any other cookie) is specific to a visitor
+            if not request.META.get('CSRF_COOKIE_USED') and not response.cookies and not self.is_replica_page_stale():
+                set_cached_page(key, response, versions, soft_timeout=timeout)
+        return response
+
+def article_tags(article):
+    return ['nav', f'article:{article.id}', f'category:{article.category.slug}']
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_changed(sender, instance, **kwargs):
+    purge_page_cache_tags(*article_tags(instance))
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    purge_page_cache_tags('nav', f'category:{instance.slug}')
+
+# Images and files are shown on article's detail page, first image also as thumbnail in article lists. Category slug
+# is looked up by article_id, as image can be deleted in cascade together with its article.
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def image_changed(sender, instance, **kwargs):
+    category_slugs = Category.objects.filter(articles=instance.article_id).values_list('slug', flat=True)
+    purge_page_cache_tags('home', 'latest', f'article:{instance.article_id}',
+                          *[f'category:{slug}' for slug in category_slugs])
+
+@receiver(post_save, sender=File)
+@receiver(post_delete, sender=File)
+@receiver(post_save, sender=Audio)
+@receiver(post_delete, sender=Audio)
+def file_changed(sender, instance, **kwargs):
+    purge_page_cache_tags(f'article:{instance.article_id}')
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    if ContentType.objects.get_for_id(instance.content_type_id).model_class() is Article:
+        purge_page_cache_tags(f'article:{instance.object_id}')
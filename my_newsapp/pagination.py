@@ -0,0 +1,90 @@
+from django.db.models import Q
+from django.http import Http404
+
+from .cursors import encode_cursor, decode_cursor
+
+# region
+# Keyset (seek) pagination for article lists ordered newest first.
+#
+# Instead of ?page=<n> (COUNT(*) of all articles, and OFFSET which makes database read and throw away all rows before
+# the page) page is addressed with a cursor - (pub_date, id) of the last article on previous page (?after=<cursor>), or
+# of the first article on next page (?before=<cursor>) when going back. Page is then fetched with
+#   WHERE (pub_date, id) < cursor ORDER BY pub_date DESC, id DESC LIMIT page_size + 1
+# which is served from (pub_date, id) index (see Article.Meta.indexes) and costs the same on every page. id breaks
+# ties between articles published at the same time. The extra row only tells if there is another page - there is no
+# total count, so pagination shows previous/next links only.
+#
+# Cursor is opaque to clients (see cursors.py). Invalid cursor, cursor with no articles after it, or both ?after= and
+# ?before= is 404 (as was ?page= which didn't exist).
+# endregion
+class KeysetPage:
+    def __init__(self, object_list, previous_cursor=None, next_cursor=None):
+        self.object_list = object_list
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+# region
+# Replaces ListView's Paginator with keyset pagination. Context gets page_obj (KeysetPage) and is_paginated as before,
+# paginator is None.
+# endregion
+class KeysetPaginationMixin:
+    after_kwarg = 'after'
+    before_kwarg = 'before'
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get(self.after_kwarg)
+        before = self.request.GET.get(self.before_kwarg)
+        # page is either after one article or before another, never between them
+        if after and before:
+            raise Http404('Invalid page.')
+        try:
+            cursor = decode_cursor(after or before) if (after or before) else None
+        except ValueError:
+            raise Http404('Invalid page.')
+
+        if before:
+            page = self.page_before(queryset, page_size, cursor)
+        else:
+            page = self.page_after(queryset, page_size, cursor)
+        return None, page, page.object_list, page.has_other_pages()
+
+    def page_after(self, queryset, page_size, cursor):
+        queryset = queryset.order_by('-pub_date', '-id')
+        if cursor is not None:
+            pub_date, id = cursor
+            queryset = queryset.filter(Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=id))
+        articles = list(queryset[:page_size + 1])
+        has_next = len(articles) > page_size
+        articles = articles[:page_size]
+        if cursor is not None and not articles:
+            raise Http404('Invalid page.')
+        return KeysetPage(
+            articles,
+            previous_cursor=encode_cursor(articles[0]) if cursor is not None else None,
+            next_cursor=encode_cursor(articles[-1]) if has_next else None,
+        )
+
+    # fetched in ascending order (nearest articles first), and reversed
+    def page_before(self, queryset, page_size, cursor):
+        pub_date, id = cursor
+        queryset = (queryset.order_by('pub_date', 'id')
+                    .filter(Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=id)))
+        articles = list(queryset[:page_size + 1])
+        has_previous = len(articles) > page_size
+        articles = articles[:page_size][::-1]
+        if not articles:
+            raise Http404('Invalid page.')
+        return KeysetPage(
+            articles,
+            previous_cursor=encode_cursor(articles[0]) if has_previous else None,
+            next_cursor=encode_cursor(articles[-1]),
+        )
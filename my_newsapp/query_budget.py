@@ -0,0 +1,106 @@
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+logger = logging.getLogger(__name__)
+
+# region
+# Query budgets - the most queries a view may run for one request, by url name. Budgets are checked by
+# tests/test_query_budgets.py (every url of my_newsapp and comments, on a seeded dataset) and, in staging, by
+# QueryBudgetMiddleware, which logs requests over budget. Budget counts every query of the request, session and user
+# included, on every database (primary and read replicas, see db_router.py), and is fixed - it doesn't grow with number
+# of articles or comments on the page, so reintroduced N+1 query (a template looping over a relation which isn't
+# prefetched, for example) fails the test.
+#
+# Together with count, queries' fingerprints (SQL with literals replaced by '?') are recorded. Fingerprint repeated in
+# one request is usually the N+1 query, so duplicates are reported next to the count.
+# endregion
+QUERY_BUDGETS = {
+    'my_newsapp:login': 0,
+    'my_newsapp:logout': 4,
+    'my_newsapp:home': 8,
+    'my_newsapp:latest-articles': 4,
+    'my_newsapp:category': 5,
+    'my_newsapp:article-detail': 14,
+    'my_newsapp:create-article': 4,
+    'my_newsapp:edit-article': 12,
+    'my_newsapp:delete-article': 18,
+    'my_newsapp:download-file': 1,
+    'my_newsapp:stream-audio': 1,
+    'my_newsapp:export-article': 0,
+    'comments:create-comment': 11,
+    'comments:create-reply': 10,
+    'comments:edit': 5,
+    'comments:delete': 9,
+    'comments:load-more-comments': 2,
+}
+# views which are not listed above
+DEFAULT_QUERY_BUDGET = 10
+
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),      # string literals
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),   # numbers
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),  # IN lists of any length
+)
+
+def fingerprint(sql):
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+# CaptureQueriesContext for every database alias, captured_queries are queries of all of them
+class CaptureAllQueriesContext:
+    def __enter__(self):
+        self.stack = ExitStack()
+        self.contexts = [self.stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.stack.__exit__(exc_type, exc_value, traceback)
+
+    @property
+    def captured_queries(self):
+        return [query for context in self.contexts for query in context.captured_queries]
+
+def get_query_budget(view_name):
+    return QUERY_BUDGETS.get(view_name, DEFAULT_QUERY_BUDGET)
+
+class QueryReport:
+    def __init__(self, view_name, queries):
+        self.view_name = view_name
+        self.count = len(queries)
+        self.budget = get_query_budget(view_name)
+        fingerprints = Counter(fingerprint(query['sql']) for query in queries)
+        self.duplicates = {sql: count for sql, count in fingerprints.items() if count > 1}
+
+    def is_over_budget(self):
+        return self.count > self.budget
+
+    def __str__(self):
+        lines = ['{}: {} queries (budget {})'.format(self.view_name, self.count, self.budget)]
+        for sql, count in sorted(self.duplicates.items(), key=lambda item: -item[1]):
+            lines.append('    {}x {}'.format(count, sql))
+        return '\n'.join(lines)
+
+# region
+# Records queries of every request and logs a warning (my_newsapp.query_budget logger) for requests over their view's
+# budget. Meant for staging - recording keeps every query's SQL of the request in memory - and enabled with
+# DJANGO_QUERY_BUDGET_MIDDLEWARE (see settings.py). Requests which don't resolve to a view (404) are not checked.
+# endregion
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with CaptureAllQueriesContext() as queries:
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            report = QueryReport(match.view_name, queries.captured_queries)
+            if report.is_over_budget():
+                logger.warning('Query budget exceeded %s %s\n%s', request.method, request.path, report)
+        return response
@@ -0,0 +1,31 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from comments.models import Comment
+from .models import Article, Category, Image, File, Audio
+
+# Article.updated_at is auto_now, so it is bumped by Article.save() itself. Changes of objects shown together with
+# article (category, images, files, audios, comments) bump it with update(), which doesn't send any signals.
+def touch_articles(**filters):
+    Article.objects.filter(**filters).update(updated_at=timezone.now())
+
+@receiver(post_save, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    touch_articles(category=instance)
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+@receiver(post_save, sender=File)
+@receiver(post_delete, sender=File)
+@receiver(post_save, sender=Audio)
+@receiver(post_delete, sender=Audio)
+def attachment_changed(sender, instance, **kwargs):
+    touch_articles(pk=instance.article_id)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(Article).id:
+        touch_articles(pk=instance.object_id)
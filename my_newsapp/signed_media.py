@@ -0,0 +1,63 @@
+import hashlib
+import hmac
+import time
+from base64 import urlsafe_b64encode
+from datetime import datetime
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.utils import timezone
+
+# region
+# Signed, expiring media urls - with SIGNED_MEDIA_URLS (see settings.py) article attachments are linked directly to
+# front web server, which checks the signature and serves the file from MEDIA_ROOT, so downloads never reach Django:
+#   SIGNED_MEDIA_URL_PREFIX<file name>?st=<signature>&ts=<signed at>&e=<lifetime>
+# signature is urlsafe base64 (without padding) HMAC-SHA256, keyed by SIGNED_MEDIA_URL_KEY, of '<path>|<ts>|<e>'.
+# That is the format of nginx's secure_link_hmac module:
+#   location /signed-media/ {
+#       secure_link_hmac $arg_st,$arg_ts,$arg_e;
+#       secure_link_hmac_secret <SIGNED_MEDIA_URL_KEY>;
+#       secure_link_hmac_message $uri|$arg_ts|$arg_e;
+#       secure_link_hmac_algorithm sha256;
+#       if ($secure_link_hmac != "1") { return 404; }
+#       alias <MEDIA_ROOT>;
+#   }
+# verify_signed_media_url() checks urls the same way.
+#
+# Urls are signed once per window of SIGNED_MEDIA_URL_LIFETIME seconds - ts is window's start, and url is valid for two
+# windows - so every url is valid for at least SIGNED_MEDIA_URL_LIFETIME after it was rendered, and page rendered
+# again in the same window has the same urls. Pages with signed urls are cached only until the window ends (see
+# SignedMediaUrlsMixin in views.py).
+# endregion
+def signing_window(now=None):
+    return int((time.time() if now is None else now) // settings.SIGNED_MEDIA_URL_LIFETIME)
+
+def signing_started_at(now=None):
+    return datetime.fromtimestamp(signing_window(now) * settings.SIGNED_MEDIA_URL_LIFETIME, timezone.utc)
+
+def signing_seconds_left(now=None):
+    now = time.time() if now is None else now
+    return (signing_window(now) + 1) * settings.SIGNED_MEDIA_URL_LIFETIME - now
+
+def media_url_signature(path, timestamp, lifetime):
+    message = '{}|{}|{}'.format(path, timestamp, lifetime).encode('utf-8')
+    digest = hmac.new(settings.SIGNED_MEDIA_URL_KEY.encode('utf-8'), message, hashlib.sha256).digest()
+    return urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+# name - file's storage name (FieldFile.name)
+def signed_media_url(name, now=None):
+    path = settings.SIGNED_MEDIA_URL_PREFIX + name
+    timestamp = signing_window(now) * settings.SIGNED_MEDIA_URL_LIFETIME
+    lifetime = 2 * settings.SIGNED_MEDIA_URL_LIFETIME
+    query = urlencode({'st': media_url_signature(path, timestamp, lifetime), 'ts': timestamp, 'e': lifetime})
+    return '{}?{}'.format(quote(path), query)
+
+# path - url's (unquoted) path, st, ts and e - its query parameters
+def verify_signed_media_url(path, st, ts, e, now=None):
+    try:
+        expires = int(ts) + int(e)
+    except ValueError:
+        return False
+    if expires < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(media_url_signature(path, ts, e), st)
@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+from .cache_keys import cache_key
+
+# region
+# Cache entries with soft and hard timeout, recomputed by one request at a time (single-flight).
+#
+# Entry is stored for hard_timeout, but it is fresh only for soft_timeout. When fresh entry can't be read, request
+# tries to take entry's lock (cache.add() is atomic in Redis and LocMem). The one which gets it recomputes the value,
+# all others meanwhile get the stale value, if there is one, or wait (polling) until the lock is released. If the lock
+# holder takes longer than STALE_CACHE_WAIT (or died holding the lock) waiting request recomputes the value itself,
+# so lock can delay request, but never fail it.
+#
+# Lock waits and stale serves are counted in cache (so counters are shared by all workers) - see get_counters() and
+# stale_cache_counters management command.
+# endregion
+STALE_CACHE_LOCK_KEY = 'lock'
+STALE_CACHE_LOCK_TIMEOUT = 30
+STALE_CACHE_WAIT = 5
+STALE_CACHE_POLL_INTERVAL = 0.05
+STALE_CACHE_COUNTER_KEY = 'stale_cache_counter'
+STALE_CACHE_COUNTERS = ('lock_waits', 'stale_serves')
+
+def get_entry(key):
+    return cache.get(key)
+
+def is_fresh(entry):
+    return entry is not None and time.time() < entry['fresh_until']
+
+def set_entry(key, value, soft_timeout, hard_timeout):
+    cache.set(key, {'value': value, 'fresh_until': time.time() + soft_timeout}, hard_timeout)
+
+# yields True to the request which got the lock, False to all others
+@contextmanager
+def recompute_lock(key):
+    lock_key = cache_key(STALE_CACHE_LOCK_KEY, key)
+    acquired = cache.add(lock_key, True, STALE_CACHE_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+
+# waits until lock holder releases the lock (or STALE_CACHE_WAIT passes), and returns entry it stored
+def wait_for_entry(key):
+    increment_counter('lock_waits')
+    lock_key = cache_key(STALE_CACHE_LOCK_KEY, key)
+    deadline = time.time() + STALE_CACHE_WAIT
+    while cache.get(lock_key) is not None and time.time() < deadline:
+        time.sleep(STALE_CACHE_POLL_INTERVAL)
+    return get_entry(key)
+
+def get_or_recompute(key, recompute, soft_timeout, hard_timeout):
+    entry = get_entry(key)
+    if is_fresh(entry):
+        return entry['value']
+
+    with recompute_lock(key) as acquired:
+        if acquired:
+            value = recompute()
+            set_entry(key, value, soft_timeout, hard_timeout)
+            return value
+
+    if entry is not None:
+        increment_counter('stale_serves')
+        return entry['value']
+
+    entry = wait_for_entry(key)
+    if entry is not None:
+        return entry['value']
+    return recompute()
+
+def counter_key(name):
+    return cache_key(STALE_CACHE_COUNTER_KEY, name)
+
+def increment_counter(name):
+    key = counter_key(name)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError: # counter was evicted between add() and incr()
+        cache.add(key, 1, None)
+
+def get_counters():
+    values = cache.get_many([counter_key(name) for name in STALE_CACHE_COUNTERS])
+    return {name: values.get(counter_key(name), 0) for name in STALE_CACHE_COUNTERS}
+
+def reset_counters():
+    cache.delete_many([counter_key(name) for name in STALE_CACHE_COUNTERS])
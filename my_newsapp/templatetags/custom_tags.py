@@ -1,6 +1,10 @@
 from django import template
 
-register = template.Library()
-
+from my_newsapp.signed_media import signed_media_url as sign
 
+register = template.Library()
 
+# signed url of uploaded file, by its storage name (see signed_media.py)
+@register.filter
+def signed_media_url(name):
+    return sign(name)
@@ -3,7 +3,7 @@ from django.utils import timezone
 
 import factory
 
-from my_newsapp.models import Category, Article, Image, File
+from my_newsapp.models import Category, Article, Image, File, Audio
 
 def create_slug(sentence):
     return '-'.join(sentence.split(' ')).lower()
@@ -62,3 +62,11 @@ class FileFactory(factory.django.DjangoModelFactory):
 
     file = factory.django.FileField()
     article = factory.SubFactory(ArticleFactory)
+
+class AudioFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Audio
+
+    audio = factory.django.FileField(filename='example.mp3', data=bytes(range(256)) * 4)
+    article = factory.SubFactory(ArticleFactory)
@@ -0,0 +1,49 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import translation
+
+from my_newsapp.tests.factories import ArticleFactory
+from comments.tests.factories import CommentFactory, ReplyFactory
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+class ArticleAdminTests(TestCase):
+    # session, user, filtered and total count, page of articles with authors and categories
+    CHANGELIST_QUERIES = 5
+
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        self.url = reverse('admin:my_newsapp_article_changelist')
+
+    def tearDown(self):
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_shows_links(self):
+        article = ArticleFactory()
+        comment = CommentFactory(object_id=article.id)
+        ReplyFactory(object_id=article.id, parent=comment) # replies are not counted
+        response = self.client.get(self.url)
+        self.assertContains(response, reverse('admin:auth_user_change', args=(article.author_id,)))
+        self.assertContains(response, reverse('admin:my_newsapp_category_change', args=(article.category_id,)))
+        self.assertContains(response, '?owner={}&type=comments'.format(article.id))
+        self.assertContains(response, '1 Comments')
+
+    def test_query_count_does_not_depend_on_rows(self):
+        ArticleFactory()
+        self.assertEqual(self.changelist_queries(), self.CHANGELIST_QUERIES)
+
+        for article in ArticleFactory.create_batch(size=20):
+            CommentFactory.create_batch(size=2, object_id=article.id)
+        self.assertEqual(self.changelist_queries(), self.CHANGELIST_QUERIES)
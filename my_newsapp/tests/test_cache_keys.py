@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+
+from my_newsapp.cache_keys import cache_key, cache_language, language_cache_key, language_cache_keys
+
+class CacheKeysTests(SimpleTestCase):
+
+    def test_cache_key(self):
+        self.assertEqual(cache_key('page_tag', 'article:5'), 'page_tag:article:5')
+
+    def test_language_cache_key_uses_active_language(self):
+        with translation.override('hr'):
+            self.assertEqual(language_cache_key('navigation_tree'), 'hr:navigation_tree')
+        self.assertEqual(language_cache_key('page', 'abc', language='en'), 'en:page:abc')
+
+    def test_unknown_or_no_language_falls_back_to_language_code(self):
+        with translation.override('de'):
+            self.assertEqual(cache_language(), 'en')
+        with translation.override(None):
+            self.assertEqual(cache_language(), 'en')
+
+    def test_language_cache_keys(self):
+        self.assertEqual(language_cache_keys('navigation_tree'), ['en:navigation_tree', 'hr:navigation_tree'])
+
+    def test_deploy_version_is_added_by_backend(self):
+        self.assertEqual(cache.make_key('en:navigation_tree'), f'my_news:{settings.CACHE_VERSION}:en:navigation_tree')
+        cache.set('en:navigation_tree', 'tree', version=settings.CACHE_VERSION - 1)
+        self.assertIsNone(cache.get('en:navigation_tree')) # key written by previous deploy is not read
+        cache.delete('en:navigation_tree', version=settings.CACHE_VERSION - 1)
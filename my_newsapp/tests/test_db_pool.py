@@ -0,0 +1,105 @@
+import threading
+from io import StringIO
+from unittest.mock import patch, Mock
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+
+from my_newsapp import db_pool
+from my_newsapp.db_pool import ConnectionPool, PoolTimeout, get_pool, get_counters
+
+class ConnectionPoolTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.connect = Mock(side_effect=lambda: Mock())
+        self.pool = ConnectionPool(self.connect, size=2, idle_timeout=60, wait_timeout=1, validate=Mock())
+
+    def test_returned_connection_is_reused(self):
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+        self.assertIs(self.pool.checkout(), connection)
+        self.connect.assert_called_once_with()
+        self.pool.validate.assert_called_once_with(connection)
+        self.assertEqual(self.pool.stats['checkouts'], 2)
+
+    def test_most_recently_returned_connection_is_reused(self):
+        first, second = self.pool.checkout(), self.pool.checkout()
+        self.pool.checkin(first)
+        self.pool.checkin(second)
+        self.assertIs(self.pool.checkout(), second)
+
+    def test_connection_which_fails_validation_is_replaced(self):
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+        self.pool.validate.side_effect = Exception('MySQL server has gone away')
+        new = self.pool.checkout()
+        self.assertIsNot(new, connection)
+        connection.close.assert_called_once_with()
+        self.assertEqual(self.pool.open, 1)
+        self.assertEqual(self.pool.stats['discarded'], 1)
+
+    def test_connection_idle_for_too_long_is_closed(self):
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+        with patch.object(db_pool.time, 'monotonic', return_value=db_pool.time.monotonic() + 61):
+            new = self.pool.checkout()
+        self.assertIsNot(new, connection)
+        connection.close.assert_called_once_with()
+        self.pool.validate.assert_not_called()
+        self.assertEqual(self.pool.open, 1)
+
+    def test_failed_connect_frees_its_place(self):
+        self.connect.side_effect = Exception("Can't connect to MySQL server")
+        with self.assertRaises(Exception):
+            self.pool.checkout()
+        self.assertEqual(self.pool.open, 0)
+
+    def test_discarded_connection_frees_its_place(self):
+        connections = [self.pool.checkout(), self.pool.checkout()]
+        self.pool.discard(connections[0])
+        self.pool.checkout()
+        self.assertEqual(self.connect.call_count, 3)
+
+    def test_checkout_waits_for_returned_connection(self):
+        connections = [self.pool.checkout(), self.pool.checkout()]
+        threading.Timer(0.05, self.pool.checkin, [connections[0]]).start()
+        self.assertIs(self.pool.checkout(), connections[0])
+        self.assertEqual(self.connect.call_count, 2)
+        self.assertEqual(self.pool.stats['waits'], 1)
+        counters = get_counters()
+        self.assertEqual(counters['waits'], 1)
+        self.assertGreater(counters['wait_ms'], 0)
+
+    def test_checkout_times_out_when_pool_is_full(self):
+        self.pool.wait_timeout = 0.01
+        self.pool.checkout(), self.pool.checkout()
+        with self.assertRaises(PoolTimeout):
+            self.pool.checkout()
+        self.assertEqual(get_counters()['timeouts'], 1)
+
+    def test_counters_are_incremented_outside_of_lock(self):
+        self.pool.wait_timeout = 0.01
+        self.pool.checkout(), self.pool.checkout()
+        locked = []
+        with patch.object(db_pool, 'increment_counter', side_effect=lambda *args: locked.append(
+                self.pool.condition._is_owned())):
+            with self.assertRaises(PoolTimeout):
+                self.pool.checkout()
+        self.assertEqual(locked, [False])
+
+    def test_pools_are_per_process(self):
+        create = Mock(side_effect=lambda: Mock())
+        pool = get_pool('pool-test', create)
+        self.assertIs(get_pool('pool-test', create), pool)
+        with patch.object(db_pool.os, 'getpid', return_value=-1):
+            self.assertIsNot(get_pool('pool-test', create), pool)
+        self.assertEqual(create.call_count, 2)
+
+    def test_db_pool_counters_command(self):
+        db_pool.increment_counter('wait_ms', 20)
+        out = StringIO()
+        call_command('db_pool_counters', '--reset', stdout=out)
+        self.assertIn('wait_ms: 20', out.getvalue())
+        self.assertEqual(get_counters(), {'waits': 0, 'wait_ms': 0, 'timeouts': 0})
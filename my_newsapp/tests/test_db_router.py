@@ -0,0 +1,116 @@
+import tempfile
+
+from django.test import TestCase, RequestFactory, override_settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import translation
+
+from my_newsapp.db_router import (ReplicaRouter, ReplicaRoutingMiddleware, REPLICA_STICKY_COOKIE, replica_reads,
+    is_replica_view, state)
+from my_newsapp.models import Article
+from my_newsapp.navigation import build_navigation_tree
+from my_newsapp.utils import get_status_none_category_ids
+from my_newsapp.views import HomeView, ArticleDetailView, CreateArticleView, EditArticleView
+from my_newsapp.tests.factories import UserFactory, ArticleFactory
+from comments.views import load_more_comments, create_comment
+
+REPLICAS = ['replica1', 'replica2']
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        state.replica, state.wrote = None, False
+
+    # runs request through middleware, returns (database view's reads went to, response)
+    def route(self, request, view):
+        databases = []
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            databases.append(self.router.db_for_read(Article))
+            return HttpResponse()
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        return databases[0], response
+
+    def test_reads_outside_of_request_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Article), 'default')
+
+    def test_writes_use_primary(self):
+        state.replica = 'replica1'
+        self.assertEqual(self.router.db_for_write(Article), 'default')
+        self.assertTrue(state.wrote)
+
+    def test_migrations_run_on_primary_only(self):
+        self.assertTrue(self.router.allow_migrate('default', 'my_newsapp'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'my_newsapp'))
+
+    def test_replica_views(self):
+        for view in [HomeView.as_view(), ArticleDetailView.as_view(), load_more_comments]:
+            self.assertTrue(is_replica_view(view))
+        for view in [CreateArticleView.as_view(), EditArticleView.as_view(), create_comment]:
+            self.assertFalse(is_replica_view(view))
+        self.assertTrue(is_replica_view(replica_reads(lambda request: None)))
+
+    def test_get_of_replica_view_reads_from_replica(self):
+        database, response = self.route(self.factory.get('/'), HomeView.as_view())
+        self.assertIn(database, REPLICAS)
+        self.assertNotIn(REPLICA_STICKY_COOKIE, response.cookies)
+        self.assertIsNone(state.replica) # reset after request
+
+    def test_replica_is_picked_once_per_request(self):
+        databases = set()
+        def get_response(request):
+            middleware.process_view(request, HomeView.as_view(), (), {})
+            databases.update(self.router.db_for_read(Article) for i in range(20))
+            return HttpResponse()
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(self.factory.get('/'))
+        self.assertEqual(len(databases), 1)
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+    def test_cached_values_are_rebuilt_from_primary(self):
+        cache.clear()
+        article = ArticleFactory()
+        state.replica = 'replica1' # not in DATABASES, reading from it would fail
+        self.assertEqual(build_navigation_tree()[0]['title'], article.category.title)
+        self.assertEqual(get_status_none_category_ids(), [article.category_id])
+
+    def test_other_views_and_methods_read_from_primary(self):
+        self.assertEqual(self.route(self.factory.get('/'), CreateArticleView.as_view())[0], 'default')
+        self.assertEqual(self.route(self.factory.post('/'), HomeView.as_view())[0], 'default')
+
+    def test_reads_are_sticky_to_primary_after_write(self):
+        def get_response(request):
+            self.router.db_for_write(Article)
+            return HttpResponse()
+        response = ReplicaRoutingMiddleware(get_response)(self.factory.post('/'))
+        cookie = response.cookies[REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+
+        request = self.factory.get('/')
+        request.COOKIES[REPLICA_STICKY_COOKIE] = cookie.value
+        self.assertEqual(self.route(request, HomeView.as_view())[0], 'default')
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+class ReplicaStickinessTests(TestCase):
+
+    def tearDown(self):
+        translation.activate('en')
+
+    def test_creating_comment_makes_reads_sticky(self):
+        article = ArticleFactory()
+        self.client.force_login(UserFactory())
+        response = self.client.post(reverse('comments:create-comment'),
+                                    {'text': 'Comment', 'owner_id': article.id, 'owner_model': 'article'},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertIn(REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_reading_doesnt_make_reads_sticky(self):
+        response = self.client.get(reverse('my_newsapp:latest-articles'))
+        self.assertNotIn(REPLICA_STICKY_COOKIE, response.cookies)
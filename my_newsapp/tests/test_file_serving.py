@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+
+from my_newsapp.file_serving import parse_range
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_range(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_range('bytes=500-', 1000), (500, 999))
+
+    def test_range_past_the_end_is_truncated(self):
+        self.assertEqual(parse_range('bytes=900-2000', 1000), (900, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-2000', 1000), (0, 999))
+
+    def test_ignored_ranges(self):
+        for header in ('bytes=0-10,20-30', 'items=0-10', 'bytes=-', 'bytes=20-10'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 1000)
+
+    def test_no_range_of_empty_file_is_satisfiable(self):
+        for header in ('bytes=-5', 'bytes=0-', 'bytes=0-10'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 0)
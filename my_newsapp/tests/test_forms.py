@@ -6,6 +6,7 @@ from my_newsapp.forms import ArticleForm, ImageForm, FileForm, ImageFormSet, Fil
 from my_newsapp.models import User
 from my_newsapp.utils import get_test_file
 from my_newsapp.tests.factories import ArticleFactory, ImageFactory, CategoryFactory
+from my_newsapp.tests.test_views import TemporaryMediaRootMixin
 
 @override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
 class ArticleFormTests(TestCase):
@@ -43,7 +44,7 @@ class ArticleFormTests(TestCase):
         self.assertTrue(form.is_valid())
         self.assertEqual(form.errors, {})
 
-class ImageFormTests(TestCase):
+class ImageFormTests(TemporaryMediaRootMixin, TestCase):
     
     def setUp(self):
         self.description = {'description': 'This is an image description.'}
@@ -85,7 +86,7 @@ class ImageFormTests(TestCase):
         self.assertEqual(form.files, {})
         self.assertEqual(form.errors, {'__all__': ['You cannot have description if image is not choosen.']})
 
-class FileFormTests(TestCase):
+class FileFormTests(TemporaryMediaRootMixin, TestCase):
     
     def setUp(self):
         self.valid_file = get_test_file('test_pdf_file.pdf')
@@ -113,8 +114,7 @@ class FileFormTests(TestCase):
             ["File extension 'jpg' is not allowed. Allowed extensions are: 'pdf, doc, docx, xls, xlsx, ppt, pptx, zip'."]}
         )
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class ImageInlineFormSetTests(TestCase):
+class ImageInlineFormSetTests(TemporaryMediaRootMixin, TestCase):
     
     def setUp(self):
         self.image_1 = get_test_file('test_image.png')
@@ -237,7 +237,7 @@ class ImageInlineFormSetTests(TestCase):
         self.assertEqual(formset.errors, [{}])
         self.assertEqual(formset.non_form_errors(), [])
     
-class FileInlineFormSetTests(TestCase):
+class FileInlineFormSetTests(TemporaryMediaRootMixin, TestCase):
     
     def setUp(self):
         self.file_1 = get_test_file('test_doc_file.doc')
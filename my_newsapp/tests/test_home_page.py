@@ -0,0 +1,220 @@
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import translation, timezone
+
+from my_newsapp.home_page import (get_home_categories, get_primary_articles, get_secondary_articles,
+    get_other_articles, assemble_home_page, rotation_window, rotation_started_at, rotation_seconds_left, rotation_seed)
+from my_newsapp.models import Category, Article
+from my_newsapp.tests.factories import CategoryFactory, ArticleFactory, ImageFactory
+from my_newsapp.tests.test_views import delete_article_test_files, TemporaryMediaRootMixin
+from my_newsapp.utils import get_status_none_categories_random_ids
+
+class HomePageTests(TemporaryMediaRootMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        CategoryFactory.create_batch(size=3)
+
+    def rand_ids(self):
+        return get_status_none_categories_random_ids()
+
+    def test_get_home_categories__primary_and_secondary_exist(self):
+        primary = CategoryFactory(status='P')
+        secondary = CategoryFactory(status='S')
+        rand_ids = self.rand_ids()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_home_categories(rand_ids), (primary, secondary))
+        self.assertEqual(len(rand_ids), 3) # no random category was used
+
+    def test_get_home_categories__primary_and_secondary_dont_exist(self):
+        rand_ids = self.rand_ids()
+        expected = Category.objects.get(id=rand_ids[-1]), Category.objects.get(id=rand_ids[-2])
+        with self.assertNumQueries(1):
+            primary, secondary = get_home_categories(rand_ids)
+        self.assertEqual((primary, secondary), expected)
+        self.assertEqual(primary.status, None)
+        self.assertEqual(len(rand_ids), 1) # popped categories are not used for other articles
+
+    def test_get_home_categories__only_primary_exists(self):
+        primary = CategoryFactory(status='P')
+        rand_ids = self.rand_ids()
+        expected_secondary = Category.objects.get(id=rand_ids[-1])
+        self.assertEqual(get_home_categories(rand_ids), (primary, expected_secondary))
+
+    def test_get_home_categories__no_category_exists(self):
+        Category.objects.all().delete() # now rand_ids will be empty
+        self.assertEqual(get_home_categories(self.rand_ids()), (None, None))
+
+    def test_get_primary_articles(self):
+        category = Category.objects.first()
+        articles = ArticleFactory.create_batch(size=4, category=category)
+        first_image = ImageFactory(article=articles[-1])
+        ImageFactory(article=articles[-1])
+
+        with self.assertNumQueries(2): # articles (with category and author) and their images
+            primary_articles = get_primary_articles(category)
+            urls = [article.get_absolute_url() for article in primary_articles]
+            authors = [article.author.username for article in primary_articles]
+        self.assertEqual(primary_articles, list(category.articles.all()[:3]))
+        self.assertEqual(primary_articles[0].cover_image, first_image)
+        self.assertIsNone(primary_articles[1].cover_image)
+        delete_article_test_files(articles[-1])
+
+    def test_get_secondary_articles(self):
+        category = Category.objects.first()
+        ArticleFactory.create_batch(size=3, category=category)
+        with self.assertNumQueries(1):
+            secondary_articles = get_secondary_articles(category)
+            urls = [article.get_absolute_url() for article in secondary_articles]
+        self.assertEqual(secondary_articles, list(category.articles.all()[:2]))
+        self.assertEqual(get_secondary_articles(None), [])
+
+    def test_get_other_articles__only_status_none_categories(self):
+        for category in Category.objects.all():
+            ArticleFactory(category=category)
+        self.assertEqual(get_other_articles().count(), 3)
+
+        for category in Category.objects.all():
+            ArticleFactory.create_batch(size=2, category=category)
+        articles = get_other_articles()
+        self.assertEqual(Article.objects.count(), 9)
+        self.assertEqual(articles.count(), 6) # maximum 6 articles
+        for article in articles:
+            self.assertEqual(article.category.status, None)
+
+    def test_get_other_articles__primary_and_secondary_category_exist(self):
+        CategoryFactory(status='P')
+        CategoryFactory(status='S')
+        for category in Category.objects.all():
+            ArticleFactory.create_batch(size=2, category=category)
+
+        articles = get_other_articles()
+        self.assertEqual(articles.count(), 6) # only 6 articles belong to categories with status=None
+        for article in articles:
+            self.assertEqual(article.category.status, None)
+
+    def test_get_other_articles__no_category_exist(self):
+        Category.objects.all().delete()
+        self.assertEqual(get_other_articles().count(), 0)
+
+    def test_get_other_articles__stand_in_categories_are_excluded(self):
+        for category in Category.objects.all():
+            ArticleFactory(category=category)
+        stand_in_ids = self.rand_ids()[:2]
+        articles = get_other_articles(stand_in_ids)
+        self.assertEqual(articles.count(), 1)
+        self.assertNotIn(articles[0].category_id, stand_in_ids)
+
+    def test_assemble_home_page(self):
+        primary = CategoryFactory(status='P')
+        ArticleFactory.create_batch(size=2, category=primary)
+        context = assemble_home_page()
+        self.assertEqual(context['primary_category'], primary)
+        self.assertEqual(context['primary_articles'], list(primary.articles.all()))
+        self.assertEqual(context['secondary_articles'], []) # random stand-in category has no articles
+
+    def test_assemble_home_page__same_seed_same_page(self):
+        CategoryFactory.create_batch(size=7)
+        for category in Category.objects.all():
+            ArticleFactory(category=category)
+        pages = [assemble_home_page(seed=1) for n in range(3)]
+        for page in pages[1:]:
+            self.assertEqual(page['primary_category'], pages[0]['primary_category'])
+            self.assertEqual(page['secondary_category'], pages[0]['secondary_category'])
+            self.assertEqual(list(page['other_articles']), list(pages[0]['other_articles']))
+        for article in pages[0]['other_articles']:
+            self.assertNotIn(article.category, [pages[0]['primary_category'], pages[0]['secondary_category']])
+
+class HomePageQueryBudgetTests(TemporaryMediaRootMixin, TestCase):
+    # conditional GET validators, navigation tree (cache is cleared) and 6 queries of home page assembler
+    QUERY_BUDGET = 8
+
+    def tearDown(self):
+        for article in Article.objects.all():
+            delete_article_test_files(article)
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    def create_catalog(self, categories, articles_per_category, images_per_article):
+        CategoryFactory(status='P')
+        CategoryFactory(status='S')
+        CategoryFactory.create_batch(size=categories)
+        for category in Category.objects.all():
+            for article in ArticleFactory.create_batch(size=articles_per_category, category=category):
+                ImageFactory.create_batch(size=images_per_article, article=article)
+
+    def assert_home_page_within_budget(self):
+        cache.clear()
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('my_newsapp:home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_small_catalog(self):
+        self.create_catalog(categories=1, articles_per_category=1, images_per_article=1)
+        self.assert_home_page_within_budget()
+
+    def test_large_catalog(self):
+        self.create_catalog(categories=10, articles_per_category=5, images_per_article=2)
+        self.assert_home_page_within_budget()
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/', HOME_ROTATION_WINDOW=300, HOME_RANDOM_SEED=None)
+class HomeRotationTests(TestCase):
+    NOW = 1500000100.0 # 100 seconds into window 5000000
+
+    def tearDown(self):
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    def test_rotation_window(self):
+        self.assertEqual(rotation_window(self.NOW), 5000000)
+        self.assertEqual(rotation_window(self.NOW + 199), 5000000)
+        self.assertEqual(rotation_window(self.NOW + 200), 5000001)
+        self.assertEqual(rotation_started_at(self.NOW), datetime.fromtimestamp(1500000000, timezone.utc))
+        self.assertEqual(rotation_seconds_left(self.NOW), 200)
+
+    def test_rotation_seed(self):
+        self.assertEqual(rotation_seed(self.NOW), 5000000)
+        with self.settings(HOME_RANDOM_SEED=7):
+            self.assertEqual(rotation_seed(self.NOW), 7)
+
+    def test_same_stand_in_categories_within_window(self):
+        cache.clear()
+        CategoryFactory.create_batch(size=10)
+        pages = []
+        for now in [self.NOW, self.NOW + 100, self.NOW + 199]:
+            with patch('my_newsapp.home_page.time.time', return_value=now):
+                pages.append(assemble_home_page())
+        for page in pages[1:]:
+            self.assertEqual(page['primary_category'], pages[0]['primary_category'])
+            self.assertEqual(page['secondary_category'], pages[0]['secondary_category'])
+
+    def test_home_page_is_cached_until_window_ends(self):
+        cache.clear()
+        with patch('my_newsapp.home_page.time.time', return_value=self.NOW), \
+                patch('my_newsapp.page_cache.set_cached_page') as set_cached_page:
+            self.client.get(reverse('my_newsapp:home'))
+        self.assertEqual(set_cached_page.call_args[1]['soft_timeout'], 200)
+
+    def test_page_rendered_across_window_end_is_cached_for_window_it_started_in(self):
+        cache.clear()
+        # request starts 100 seconds into the window, rendering runs into the next one
+        with patch('my_newsapp.views.rotation_now', return_value=self.NOW), \
+                patch('my_newsapp.home_page.time.time', return_value=self.NOW + 250), \
+                patch('my_newsapp.views.assemble_home_page', return_value={}) as assemble_home_page, \
+                patch('my_newsapp.page_cache.set_cached_page') as set_cached_page:
+            self.client.get(reverse('my_newsapp:home'))
+        assemble_home_page.assert_called_once_with(seed=5000000)
+        self.assertEqual(set_cached_page.call_args[1]['soft_timeout'], 200)
+
+    def test_etag_changes_with_window(self):
+        url = reverse('my_newsapp:home')
+        with patch('my_newsapp.home_page.time.time', return_value=self.NOW):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with patch('my_newsapp.home_page.time.time', return_value=self.NOW + 200):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
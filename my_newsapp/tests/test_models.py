@@ -1,13 +1,18 @@
 import tempfile
+from io import StringIO
+from unittest.mock import patch
 
 from django.test import TestCase, override_settings
+from django.core.management import call_command, CommandError
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.urls import reverse
 
-from my_newsapp.models import Category, Article
+from my_newsapp.models import Category, Article, File
 from my_newsapp.tests.factories import CategoryFactory, ArticleFactory, ImageFactory, FileFactory
+from my_newsapp.tests.test_views import TemporaryMediaRootMixin
 from my_newsapp.utils import get_test_file
+from my_newsapp.management.commands.explain_hot_queries import Command
 
 @override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
 class CategoryTests(TestCase):
@@ -97,8 +102,32 @@ class ArticleTests(TestCase):
         for i in range( 0, articles.count() - 1):
             self.assertTrue(articles[i].pub_date > articles[i+1].pub_date)
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class ImageTests(TestCase):
+    def test_text_html_is_rendered_on_save(self):
+        article = Article.objects.all()[0]
+        article.text = 'First paragraph\n\nSecond <b>paragraph</b>\nwith line break'
+        article.save()
+        article.refresh_from_db()
+        self.assertEqual(article.text_html,
+            '<p>First paragraph</p>\n\n<p>Second &lt;b&gt;paragraph&lt;/b&gt;<br />with line break</p>')
+
+    def test_text_html_is_rendered_for_every_translation(self):
+        article = Article.objects.all()[0]
+        article.text_en = 'english\ntext'
+        article.text_hr = 'hrvatski\ntekst'
+        article.save()
+        self.assertEqual(article.text_html_en, '<p>english<br />text</p>')
+        self.assertEqual(article.text_html_hr, '<p>hrvatski<br />tekst</p>')
+
+    def test_save_doesnt_overwrite_comment_count(self):
+        article = Article.objects.all()[0]
+        Article.objects.filter(pk=article.pk).update(comment_count=3) # comments added since article was loaded
+        article.title = 'Edited title'
+        article.save()
+        article.refresh_from_db()
+        self.assertEqual(article.title, 'Edited title')
+        self.assertEqual(article.comment_count, 3)
+
+class ImageTests(TemporaryMediaRootMixin, TestCase):
 
     def setUp(self):
         self.image = ImageFactory(image__filename='test_image.png', image__format='png')
@@ -121,8 +150,7 @@ class ImageTests(TestCase):
         self.assertEqual(self.image.__str__(), self.image.image)
         self.assertEqual(self.image.__str__(), 'test_image.png')
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class FileTests(TestCase):
+class FileTests(TemporaryMediaRootMixin, TestCase):
 
     def setUp(self):
         self.doc_file = FileFactory(file=get_test_file('test_doc_file.doc'))
@@ -162,4 +190,60 @@ class FileTests(TestCase):
                 
     def test_path_method(self):
         self.assertEqual(self.doc_file.path(), 
-            '{0}{1}'.format(settings.MEDIA_ROOT, 'files/test_doc_file.doc'))
\ No newline at end of file
+            '{0}{1}'.format(settings.MEDIA_ROOT, 'files/test_doc_file.doc'))
+
+    def test_metadata_is_stored_on_upload(self):
+        self.assertEqual(self.doc_file.mime_type, 'application/msword')
+        self.assertEqual(self.doc_file.icon, 'my_newsapp/file_type_icons/doc_docx.png')
+        self.assertEqual(self.pdf_file.size, self.pdf_file.file.size)
+        self.assertEqual(self.unsupported_file.icon, '')
+        self.assertIsNone(self.unsupported_file.get_type_icon())
+
+    def test_reading_metadata_does_not_call_libmagic(self):
+        file = File.objects.get(id=self.doc_file.id)
+        with patch('magic.Magic') as magic:
+            file.get_type_icon()
+            file.content_type()
+            file.save() # file is not uploaded again
+        magic.assert_not_called()
+
+    def test_backfill_file_metadata_command(self):
+        File.objects.filter(id=self.pdf_file.id).update(mime_type='', icon='', size=None)
+        self.unsupported_file.file.delete(save=False) # row stays, but file is missing from storage
+        File.objects.filter(id=self.unsupported_file.id).update(mime_type='')
+
+        out, err = StringIO(), StringIO()
+        call_command('backfill_file_metadata', stdout=out, stderr=err)
+        self.assertIn('1 files updated, 1 missing', out.getvalue())
+        self.assertIn('test_file.txt', err.getvalue())
+
+        pdf_file = File.objects.get(id=self.pdf_file.id)
+        self.assertEqual(pdf_file.mime_type, 'application/pdf')
+        self.assertEqual(pdf_file.get_type_icon(), 'my_newsapp/file_type_icons/pdf.png')
+        self.assertEqual(pdf_file.size, self.pdf_file.size)
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+class ExplainHotQueriesCommandTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_hot_queries', '--seed', 50, stdout=out)
+        for name in ['latest articles', 'category articles', 'article detail', 'home categories', 'comments page',
+                     'comment replies']:
+            self.assertIn('{}: ok'.format(name), out.getvalue())
+
+    def test_seeded_data_is_rolled_back(self):
+        call_command('explain_hot_queries', '--seed', 10, stdout=StringIO())
+        self.assertFalse(Article.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_error_without_data(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_hot_queries', stdout=StringIO())
+
+    def test_full_table_scan_fails(self):
+        ArticleFactory()
+        with patch.object(Command, 'get_hot_queries', return_value=[
+                ('unindexed', Article.objects.filter(short_description='unindexed').order_by())]):
+            with self.assertRaisesMessage(CommandError, 'Full table scan in: unindexed'):
+                call_command('explain_hot_queries', stdout=StringIO())
@@ -0,0 +1,67 @@
+from unittest.mock import Mock
+
+from django.test import SimpleTestCase
+
+from my_newsapp.mysql_pool.base import DatabaseWrapper, ping
+
+SETTINGS = {
+    'ENGINE': 'my_newsapp.mysql_pool',
+    'NAME': 'newsapp',
+    'USER': '',
+    'PASSWORD': '',
+    'HOST': '',
+    'PORT': '',
+    'OPTIONS': {},
+    'TIME_ZONE': None,
+    'AUTOCOMMIT': True,
+    'CONN_MAX_AGE': 0,
+    'POOL': {'SIZE': 2},
+}
+
+# wrapper is never connected - pool is a mock, and so is the connection it hands out
+class PooledDatabaseWrapperTests(SimpleTestCase):
+
+    def setUp(self):
+        self.wrapper = DatabaseWrapper(dict(SETTINGS), alias='pool-test')
+        self.pool = Mock()
+        self.wrapper.get_pool = Mock(return_value=self.pool)
+        self.connection = self.wrapper.connection = Mock()
+        self.wrapper.autocommit = True # as connect() leaves it
+
+    def test_pool_is_configured_by_database_settings(self):
+        pool = DatabaseWrapper(dict(SETTINGS), alias='pool-test').create_pool()
+        self.assertEqual(pool.size, 2)
+        self.assertEqual(pool.idle_timeout, 300) # DB_POOL_DEFAULTS
+        self.assertIs(pool.validate, ping)
+
+    def test_new_connection_is_checked_out(self):
+        self.assertIs(self.wrapper.get_new_connection({}), self.pool.checkout.return_value)
+
+    def test_closed_connection_is_returned_to_pool(self):
+        self.wrapper._close()
+        self.pool.checkin.assert_called_once_with(self.connection)
+        self.pool.discard.assert_not_called()
+
+    def test_connection_in_atomic_block_is_discarded(self):
+        self.wrapper.in_atomic_block = True
+        self.wrapper._close()
+        self.pool.discard.assert_called_once_with(self.connection)
+        self.pool.checkin.assert_not_called()
+
+    def test_connection_not_in_autocommit_mode_is_discarded(self):
+        self.wrapper.autocommit = False
+        self.wrapper._close()
+        self.pool.discard.assert_called_once_with(self.connection)
+        self.pool.checkin.assert_not_called()
+
+    def test_connection_which_had_errors_is_discarded(self):
+        self.wrapper.errors_occurred = True
+        self.wrapper._close()
+        self.pool.discard.assert_called_once_with(self.connection)
+        self.pool.checkin.assert_not_called()
+
+    def test_closing_without_connection_does_nothing(self):
+        self.wrapper.connection = None
+        self.wrapper._close()
+        self.pool.discard.assert_not_called()
+        self.pool.checkin.assert_not_called()
@@ -0,0 +1,64 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
+
+from my_newsapp.navigation import build_navigation_tree, get_navigation_tree, navigation_cache_key
+from my_newsapp.tests.factories import CategoryFactory, ArticleFactory
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+class NavigationTreeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = CategoryFactory()
+        self.articles = ArticleFactory.create_batch(size=3, category=self.category)
+
+    def test_build_navigation_tree(self):
+        CategoryFactory() # category without articles is not included
+        with CaptureQueriesContext(connection) as queries:
+            tree = build_navigation_tree()
+        self.assertEqual(len(queries.captured_queries), 1)
+        for field in ('text', 'text_html', 'short_description'):
+            self.assertNotIn('"my_newsapp_article"."{}'.format(field), queries.captured_queries[0]['sql'])
+
+        self.assertEqual(len(tree), 1)
+        self.assertEqual(tree[0]['title'], self.category.title)
+        self.assertEqual(tree[0]['url'], self.category.get_absolute_url())
+        # articles are ordered as in Article.Meta.ordering - newest first
+        self.assertEqual(
+            tree[0]['articles'],
+            [{'title': article.title, 'url': article.get_absolute_url()} for article in self.category.articles.all()]
+        )
+
+    def test_tree_is_cached_per_language(self):
+        with translation.override('en'):
+            get_navigation_tree()
+        self.assertIsNotNone(cache.get(navigation_cache_key('en')))
+        self.assertIsNone(cache.get(navigation_cache_key('hr')))
+
+        with translation.override('hr'):
+            tree = get_navigation_tree()
+        self.assertTrue(tree[0]['url'].startswith('/hr/'))
+
+    def test_tree_is_invalidated_on_article_save_and_delete(self):
+        get_navigation_tree()
+        new_article = ArticleFactory(category=self.category)
+        self.assertIsNone(cache.get(navigation_cache_key()))
+        self.assertIn(new_article.title, [article['title'] for article in get_navigation_tree()[0]['articles']])
+
+        new_article.delete()
+        self.assertIsNone(cache.get(navigation_cache_key()))
+        self.assertNotIn(new_article.title, [article['title'] for article in get_navigation_tree()[0]['articles']])
+
+    def test_tree_is_invalidated_on_category_save_and_delete(self):
+        get_navigation_tree()
+        self.category.title = 'Renamed Category'
+        self.category.save()
+        self.assertEqual(get_navigation_tree()[0]['title'], 'Renamed Category')
+
+        self.category.delete()
+        self.assertEqual(get_navigation_tree(), [])
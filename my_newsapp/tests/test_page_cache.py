@@ -0,0 +1,97 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import translation
+
+from my_newsapp.page_cache import page_cache_purged_tag_key, article_tags
+from my_newsapp.tests.factories import CategoryFactory, ArticleFactory, ImageFactory
+from my_newsapp.tests.test_views import TemporaryMediaRootMixin
+from comments.tests.factories import CommentFactory
+
+class PageCacheTests(TemporaryMediaRootMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.article = ArticleFactory()
+        ImageFactory(article=self.article)
+        self.other_article = ArticleFactory()
+        self.detail_url = self.article.get_absolute_url()
+
+    def tearDown(self):
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    def test_anonymous_page_is_served_from_cache(self):
+        first = self.client.get(self.detail_url)
+        self.assertFalse(first.has_header('X-Page-Cache'))
+
+        # only query is the one for conditional GET validators (see ConditionalGetMixin)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.detail_url)
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+
+    def test_logged_in_user_is_not_served_from_cache(self):
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.get(self.detail_url)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(self.detail_url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'Comment') # comment form is shown to logged in user
+
+    def test_query_string_and_language_are_part_of_key(self):
+        url = reverse('my_newsapp:latest-articles')
+        self.client.get(url + '?page=1')
+        self.assertFalse(self.client.get(url).has_header('X-Page-Cache'))
+        self.assertTrue(self.client.get(url + '?page=1').has_header('X-Page-Cache'))
+
+        with translation.override('hr'):
+            hr_url = reverse('my_newsapp:latest-articles')
+        self.assertFalse(self.client.get(hr_url + '?page=1').has_header('X-Page-Cache'))
+
+    def test_comment_purges_only_its_article_page(self):
+        other_url = self.other_article.get_absolute_url()
+        self.client.get(self.detail_url)
+        self.client.get(other_url)
+
+        comment = CommentFactory(object_id=self.article.id)
+
+        response = self.client.get(self.detail_url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, comment.text)
+        self.assertTrue(self.client.get(other_url).has_header('X-Page-Cache'))
+
+    def test_article_change_purges_pages_showing_navigation(self):
+        category_url = self.other_article.category.get_absolute_url()
+        self.client.get(reverse('my_newsapp:home'))
+        self.client.get(category_url)
+
+        self.article.title = 'Changed title'
+        self.article.save()
+
+        for url in (reverse('my_newsapp:home'), category_url):
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('X-Page-Cache'))
+            self.assertContains(response, 'Changed title') # in navigation
+
+    def test_image_change_purges_article_page(self):
+        self.client.get(self.detail_url)
+        ImageFactory(article=self.article)
+        self.assertFalse(self.client.get(self.detail_url).has_header('X-Page-Cache'))
+
+    @override_settings(DATABASE_REPLICAS=['default'], REPLICA_STICKY_SECONDS=10)
+    def test_page_rendered_from_replica_right_after_purge_is_not_stored(self):
+        # 'default' stands in for the replica detail page is read from
+        self.article.save()
+        self.client.get(self.detail_url)
+        self.assertFalse(self.client.get(self.detail_url).has_header('X-Page-Cache'))
+
+        cache.delete_many([page_cache_purged_tag_key(tag) for tag in article_tags(self.article)]) # replicas caught up
+        self.client.get(self.detail_url)
+        self.assertEqual(self.client.get(self.detail_url)['X-Page-Cache'], 'HIT')
+
+    def test_error_responses_are_not_cached(self):
+        url = reverse('my_newsapp:latest-articles') + '?after=invalid-cursor'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertFalse(self.client.get(url).has_header('X-Page-Cache'))
@@ -0,0 +1,19 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from my_newsapp.pagination import encode_cursor, decode_cursor
+from my_newsapp.tests.factories import ArticleFactory
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+class CursorTests(TestCase):
+
+    def test_cursor_round_trip(self):
+        article = ArticleFactory()
+        cursor = encode_cursor(article)
+        self.assertEqual(decode_cursor(cursor), (article.pub_date, article.id))
+
+    def test_invalid_cursor(self):
+        for cursor in ('', 'invalid', 'bm90LWEtZGF0ZXwx', 'MjAxOS0wMS0wMVQwMDowMDowMHxub3QtYW4taWQ'):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
@@ -0,0 +1,153 @@
+from importlib import import_module
+
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+from django.utils import translation
+
+from my_newsapp.models import Article
+from my_newsapp.query_budget import QueryReport, CaptureAllQueriesContext, fingerprint, QUERY_BUDGETS
+from my_newsapp.tests.factories import (UserFactory, CategoryFactory, ArticleFactory, ImageFactory, FileFactory,
+                                       AudioFactory)
+from my_newsapp.tests.test_views import delete_article_test_files, TemporaryMediaRootMixin
+from my_newsapp.cursors import encode_cursor
+from comments.tests.factories import CommentFactory, ReplyFactory
+
+URLCONFS = ('my_newsapp.urls', 'comments.urls')
+
+def url_names():
+    names = []
+    for urlconf in URLCONFS:
+        module = import_module(urlconf)
+        names += ['{}:{}'.format(module.app_name, pattern.name) for pattern in module.urlpatterns]
+    return names
+
+# region
+# Requests every url of my_newsapp and comments apps on a seeded dataset - big enough that a query per article,
+# image, comment or reply would push view over its budget (see query_budget.py) - and fails for views over budget.
+# Page cache is cleared before every request, so pages are rendered. New url fails test_every_url_is_requested until
+# it is added to get_requests() here (and, if it needs more than default budget, to QUERY_BUDGETS).
+# endregion
+class QueryBudgetTests(TemporaryMediaRootMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        categories = [CategoryFactory(status='P'), CategoryFactory(status='S')] + CategoryFactory.create_batch(size=4)
+        for category in categories:
+            for article in ArticleFactory.create_batch(size=3, category=category, author=cls.user):
+                ImageFactory.create_batch(size=2, article=article)
+                FileFactory(article=article)
+                AudioFactory(article=article)
+        cls.article = Article.objects.first()
+        cls.comments = [CommentFactory(object_id=cls.article.id, author=cls.user) for n in range(12)]
+        for comment in cls.comments:
+            ReplyFactory.create_batch(size=2, object_id=cls.article.id, parent=comment)
+
+    @classmethod
+    def tearDownClass(cls):
+        for article in Article.objects.all():
+            delete_article_test_files(article)
+        super().tearDownClass()
+
+    def tearDown(self):
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    # url name: (method, url kwargs, data, ajax, logged in)
+    def get_requests(self):
+        article, comment = self.article, self.comments[-1]
+        article_kwargs = {'category': article.category.slug, 'id': article.id, 'slug': article.slug}
+        owner = {'owner_id': article.id, 'owner_model': 'article'}
+        return {
+            'my_newsapp:login': ('get', {}, {}, False, False),
+            'my_newsapp:logout': ('get', {}, {}, False, True),
+            'my_newsapp:home': ('get', {}, {}, False, False),
+            'my_newsapp:latest-articles': ('get', {}, {}, False, False),
+            'my_newsapp:category': ('get', {'slug': article.category.slug}, {}, False, False),
+            'my_newsapp:article-detail': ('get', article_kwargs, {}, False, True),
+            'my_newsapp:create-article': ('get', {}, {}, False, True),
+            'my_newsapp:edit-article': ('get', {'id': article.id}, {}, False, True),
+            'my_newsapp:delete-article': ('post', {'id': Article.objects.last().id}, {}, False, True),
+            'my_newsapp:download-file': ('get', {'id': article.files.first().id}, {}, False, False),
+            'my_newsapp:stream-audio': ('get', {'id': article.audios.first().id}, {}, False, False),
+            'my_newsapp:export-article': ('get', {'id': article.id}, {}, False, True),
+            'comments:create-comment': ('post', {}, dict(owner, text='New comment'), True, True),
+            'comments:create-reply': ('post', {}, dict(owner, text='New reply', parent_id=comment.id), True, True),
+            'comments:edit': ('post', {'pk': comment.id}, {'text': 'Edited'}, True, True),
+            'comments:delete': ('post', {'pk': comment.replies.first().id}, {}, True, True),
+            'comments:load-more-comments': ('get', {}, {
+                'after': encode_cursor(self.comments[-5]), # last of the comments rendered with article
+                'limit': 5,
+                'content_type_id': comment.content_type_id,
+                'owner_id': article.id,
+            }, True, False),
+        }
+
+    def request(self, name, method, kwargs, data, ajax, logged_in):
+        client = Client()
+        if logged_in:
+            client.force_login(self.user)
+        cache.clear()
+        extra = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+        with CaptureAllQueriesContext() as queries:
+            response = getattr(client, method)(reverse(name, kwargs=kwargs), data, **extra)
+        self.assertLess(response.status_code, 500, name)
+        return QueryReport(name, queries.captured_queries)
+
+    def test_every_url_is_requested(self):
+        self.assertEqual(sorted(self.get_requests()), sorted(url_names()))
+
+    def test_views_are_within_query_budget(self):
+        reports = [self.request(name, *spec) for name, spec in self.get_requests().items()]
+        over_budget = [str(report) for report in reports if report.is_over_budget()]
+        self.assertFalse(over_budget, '\n'.join(over_budget))
+
+class QueryReportTests(TestCase):
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM a WHERE id = 12 AND title = 'it''s' AND b IN (1, 2, 3) LIMIT 21"),
+            'SELECT * FROM a WHERE id = ? AND title = ? AND b IN (...) LIMIT ?')
+
+    def test_report(self):
+        queries = [{'sql': 'SELECT * FROM image WHERE article_id = {}'.format(id)} for id in range(3)]
+        queries.append({'sql': 'SELECT * FROM article'})
+        report = QueryReport('my_newsapp:latest-articles', queries)
+        self.assertEqual(report.count, 4)
+        self.assertEqual(report.budget, QUERY_BUDGETS['my_newsapp:latest-articles'])
+        self.assertEqual(report.duplicates, {'SELECT * FROM image WHERE article_id = ?': 3})
+        self.assertIn('3x SELECT * FROM image WHERE article_id = ?', str(report))
+
+    def test_queries_are_captured_on_every_database(self):
+        # 'default' stands in for a replica too, so its query is captured once for each alias
+        with patch('my_newsapp.query_budget.connections', {'default': connections['default'],
+                                                           'replica1': connections['default']}):
+            with CaptureAllQueriesContext() as queries:
+                Article.objects.count()
+        self.assertEqual(len(queries.captured_queries), 2)
+
+@override_settings(MIDDLEWARE=settings.MIDDLEWARE + ['my_newsapp.query_budget.QueryBudgetMiddleware'])
+class QueryBudgetMiddlewareTests(TemporaryMediaRootMixin, TestCase):
+
+    def setUp(self):
+        self.file = FileFactory()
+
+    def tearDown(self):
+        delete_article_test_files(self.file.article)
+        translation.activate('en')
+
+    def test_request_over_budget_is_logged(self):
+        with patch.dict(QUERY_BUDGETS, {'my_newsapp:download-file': 0}):
+            with self.assertLogs('my_newsapp.query_budget', 'WARNING') as logs:
+                self.client.get(reverse('my_newsapp:download-file', kwargs={'id': self.file.id}))
+        self.assertIn('my_newsapp:download-file: 1 queries (budget 0)', logs.output[0])
+
+    def test_request_within_budget_is_not_logged(self):
+        with patch('my_newsapp.query_budget.logger') as logger:
+            self.client.get(reverse('my_newsapp:download-file', kwargs={'id': self.file.id}))
+        logger.warning.assert_not_called()
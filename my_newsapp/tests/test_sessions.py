@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.urls import reverse
+from django.utils import translation
+
+from my_newsapp.tests.factories import ArticleFactory, ImageFactory
+from my_newsapp.tests.test_views import delete_article_test_files, TemporaryMediaRootMixin
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+}
+SESSION_MESSAGES = 'django.contrib.messages.storage.session.SessionStorage'
+COOKIE_MESSAGES = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# region
+# Benchmark of database round trips per request of logged in editor - open edit article page, save article, get
+# redirected to article page which shows 'Article updated' message - for session engines and message storages.
+# editor_requests() returns number of django_session queries for each of the three requests. Measured:
+#   db + session messages          [1, 2, 2] - session read on every request, write when message is added/shown
+#   db + cookie messages           [1, 1, 1]
+#   cached_db + session messages   [0, 1, 1] - only writes hit database
+#   cached_db + cookie messages    [0, 0, 0]
+#   cache + any messages           [0, 0, 0]
+# endregion
+class SessionQueriesBenchmark(TemporaryMediaRootMixin, TestCase):
+
+    def setUp(self):
+        caches['sessions'].clear()
+        User.objects.create_user(username='editor', password='testpass123')
+        self.article = ArticleFactory()
+        ImageFactory(article=self.article)
+
+    def tearDown(self):
+        delete_article_test_files(self.article)
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    def editor_requests(self, session_engine, message_storage):
+        with self.settings(SESSION_ENGINE=session_engine, MESSAGE_STORAGE=message_storage):
+            # SessionMiddleware imports SESSION_ENGINE when client's handler loads middleware, so each run needs a new one
+            self.client = self.client_class()
+            self.client.login(username='editor', password='testpass123')
+            edit_url = reverse('my_newsapp:edit-article', kwargs={'id': self.article.id})
+            data = {
+                'title': 'Edited title', 'short_description': self.article.short_description,
+                'text': self.article.text, 'category': self.article.category.id,
+                'images-TOTAL_FORMS': '0', 'images-INITIAL_FORMS': '0', 'images-MAX_NUM_FORMS': '20',
+                'files-TOTAL_FORMS': '0', 'files-INITIAL_FORMS': '0', 'files-MAX_NUM_FORMS': '20',
+            }
+            requests = [
+                lambda response: self.client.get(edit_url),
+                lambda response: self.client.post(edit_url, data),
+                lambda response: self.client.get(response.url), # redirect after successful edit
+            ]
+            session_queries = []
+            response = None
+            for request in requests:
+                with CaptureQueriesContext(connection) as context:
+                    response = request(response)
+                session_queries.append(
+                    len([query for query in context.captured_queries if 'django_session' in query['sql']]))
+            self.assertContains(response, 'Article updated')
+            self.client.logout()
+            return session_queries
+
+    def test_db_sessions(self):
+        self.assertEqual(self.editor_requests(SESSION_ENGINES['db'], SESSION_MESSAGES), [1, 2, 2])
+        self.assertEqual(self.editor_requests(SESSION_ENGINES['db'], COOKIE_MESSAGES), [1, 1, 1])
+
+    def test_cached_db_sessions(self):
+        self.assertEqual(self.editor_requests(SESSION_ENGINES['cached_db'], SESSION_MESSAGES), [0, 1, 1])
+        self.assertEqual(self.editor_requests(SESSION_ENGINES['cached_db'], COOKIE_MESSAGES), [0, 0, 0])
+
+    def test_cache_sessions(self):
+        self.assertEqual(self.editor_requests(SESSION_ENGINES['cache'], SESSION_MESSAGES), [0, 0, 0])
+        self.assertEqual(self.editor_requests(SESSION_ENGINES['cache'], COOKIE_MESSAGES), [0, 0, 0])
+
+class CopySessionsToCacheTests(TestCase):
+
+    def setUp(self):
+        caches['sessions'].clear()
+        User.objects.create_user(username='editor', password='testpass123')
+
+    def test_db_session_survives_switch_to_cache_engine(self):
+        with self.settings(SESSION_ENGINE=SESSION_ENGINES['db']):
+            self.client.login(username='editor', password='testpass123')
+
+        with self.settings(SESSION_ENGINE=SESSION_ENGINES['cache']):
+            out = StringIO()
+            call_command('copy_sessions_to_cache', stdout=out)
+            self.assertIn('1 sessions copied to cache', out.getvalue())
+
+            Session.objects.all().delete() # cache engine never reads the table
+            client = self.client_class()
+            client.cookies = self.client.cookies
+            self.assertEqual(client.get(reverse('my_newsapp:create-article')).status_code, 200) # still logged in
+
+    def test_refuses_non_cache_engine(self):
+        with self.settings(SESSION_ENGINE=SESSION_ENGINES['db']):
+            with self.assertRaises(CommandError):
+                call_command('copy_sessions_to_cache')
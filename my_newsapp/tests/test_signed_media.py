@@ -0,0 +1,97 @@
+from datetime import datetime
+from unittest.mock import patch
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from my_newsapp.signed_media import (signing_window, signing_started_at, signing_seconds_left, signed_media_url,
+                                     verify_signed_media_url)
+from my_newsapp.tests.factories import ArticleFactory, FileFactory
+from my_newsapp.tests.test_views import delete_article_test_files, TemporaryMediaRootMixin
+
+SIGNED_MEDIA_SETTINGS = {
+    'SIGNED_MEDIA_URLS': True,
+    'SIGNED_MEDIA_URL_KEY': 'test-key',
+    'SIGNED_MEDIA_URL_PREFIX': '/signed-media/',
+    'SIGNED_MEDIA_URL_LIFETIME': 300,
+}
+
+def verify(url, now):
+    parts = urlsplit(url)
+    query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+    return verify_signed_media_url(unquote(parts.path), query['st'], query['ts'], query['e'], now=now)
+
+@override_settings(**SIGNED_MEDIA_SETTINGS)
+class SignedMediaUrlTests(TestCase):
+    NOW = 1500000100.0 # 100 seconds into window 5000000
+
+    def test_signing_window(self):
+        self.assertEqual(signing_window(self.NOW), 5000000)
+        self.assertEqual(signing_window(self.NOW + 200), 5000001)
+        self.assertEqual(signing_started_at(self.NOW), datetime.fromtimestamp(1500000000, timezone.utc))
+        self.assertEqual(signing_seconds_left(self.NOW), 200)
+
+    def test_url(self):
+        url = signed_media_url('files/report 1.pdf', now=self.NOW)
+        self.assertTrue(url.startswith('/signed-media/files/report%201.pdf?'))
+        query = parse_qs(urlsplit(url).query)
+        self.assertEqual(query['ts'], ['1500000000'])
+        self.assertEqual(query['e'], ['600'])
+
+    def test_url_is_the_same_within_window(self):
+        self.assertEqual(signed_media_url('files/a.pdf', now=self.NOW), signed_media_url('files/a.pdf', now=self.NOW + 199))
+        self.assertNotEqual(signed_media_url('files/a.pdf', now=self.NOW), signed_media_url('files/a.pdf', now=self.NOW + 200))
+
+    def test_url_is_valid_for_at_least_lifetime(self):
+        url = signed_media_url('files/a.pdf', now=self.NOW + 199)
+        self.assertTrue(verify(url, now=self.NOW + 199 + 300))
+        self.assertFalse(verify(url, now=self.NOW + 501))
+
+    def test_tampered_url_is_not_valid(self):
+        url = signed_media_url('files/a.pdf', now=self.NOW)
+        self.assertFalse(verify(url.replace('a.pdf', 'b.pdf'), now=self.NOW))
+        self.assertFalse(verify(url.replace('e=600', 'e=6000'), now=self.NOW))
+        with self.settings(SIGNED_MEDIA_URL_KEY='other-key'):
+            self.assertFalse(verify(url, now=self.NOW))
+
+@override_settings(**SIGNED_MEDIA_SETTINGS)
+class SignedMediaDetailPageTests(TemporaryMediaRootMixin, TestCase):
+    NOW = SignedMediaUrlTests.NOW
+
+    def setUp(self):
+        cache.clear()
+        self.file = FileFactory(article=ArticleFactory())
+        article = self.file.article
+        self.url = reverse('my_newsapp:article-detail', kwargs={'category': article.category.slug, 'id': article.id,
+                                                                'slug': article.slug})
+
+    def tearDown(self):
+        delete_article_test_files(self.file.article)
+        translation.activate('en')
+
+    def test_files_are_linked_with_signed_urls(self):
+        with patch('my_newsapp.signed_media.time.time', return_value=self.NOW):
+            response = self.client.get(self.url)
+        self.assertContains(response, signed_media_url(self.file.file.name, now=self.NOW).replace('&', '&amp;'))
+        self.assertNotContains(response, reverse('my_newsapp:download-file', kwargs={'id': self.file.id}))
+
+    @override_settings(SIGNED_MEDIA_URLS=False)
+    def test_files_are_linked_to_download_view_without_signed_urls(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, reverse('my_newsapp:download-file', kwargs={'id': self.file.id}))
+
+    def test_page_is_cached_until_window_ends(self):
+        with patch('my_newsapp.signed_media.time.time', return_value=self.NOW), \
+                patch('my_newsapp.page_cache.set_cached_page') as set_cached_page:
+            self.client.get(self.url)
+        self.assertEqual(set_cached_page.call_args[1]['soft_timeout'], 200)
+
+    def test_etag_changes_with_window(self):
+        with patch('my_newsapp.signed_media.time.time', return_value=self.NOW):
+            etag = self.client.get(self.url)['ETag']
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with patch('my_newsapp.signed_media.time.time', return_value=self.NOW + 200):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
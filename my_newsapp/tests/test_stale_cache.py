@@ -0,0 +1,93 @@
+import tempfile
+from io import StringIO
+from unittest.mock import patch, Mock
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import translation
+
+from my_newsapp import stale_cache
+from my_newsapp.stale_cache import get_or_recompute, recompute_lock, set_entry, get_counters
+from my_newsapp.page_cache import page_cache_key, purge_page_cache_tags
+from my_newsapp.tests.factories import ArticleFactory
+
+class StaleCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.recompute = Mock(return_value='new')
+
+    def test_miss_is_recomputed_and_stored(self):
+        self.assertEqual(get_or_recompute('key', self.recompute, 60, 120), 'new')
+        self.assertEqual(get_or_recompute('key', self.recompute, 60, 120), 'new')
+        self.recompute.assert_called_once_with()
+
+    def test_stale_entry_is_recomputed_by_lock_holder(self):
+        set_entry('key', 'old', 0, 120)
+        self.assertEqual(get_or_recompute('key', self.recompute, 60, 120), 'new')
+        self.assertEqual(get_counters(), {'lock_waits': 0, 'stale_serves': 0})
+
+    def test_stale_entry_is_served_while_other_request_recomputes(self):
+        set_entry('key', 'old', 0, 120)
+        with recompute_lock('key') as acquired:
+            self.assertTrue(acquired)
+            self.assertEqual(get_or_recompute('key', self.recompute, 60, 120), 'old')
+        self.recompute.assert_not_called()
+        self.assertEqual(get_counters()['stale_serves'], 1)
+
+    def test_miss_waits_for_lock_holder(self):
+        def lock_holder_stores_entry(seconds):
+            set_entry('key', 'from lock holder', 60, 120)
+            cache.delete('lock:key')
+        with recompute_lock('key'), patch.object(stale_cache.time, 'sleep', side_effect=lock_holder_stores_entry):
+            self.assertEqual(get_or_recompute('key', self.recompute, 60, 120), 'from lock holder')
+        self.recompute.assert_not_called()
+        self.assertEqual(get_counters()['lock_waits'], 1)
+
+    @patch.object(stale_cache, 'STALE_CACHE_WAIT', 0)
+    def test_miss_is_recomputed_if_lock_holder_is_too_slow(self):
+        with recompute_lock('key'):
+            self.assertEqual(get_or_recompute('key', self.recompute, 60, 120), 'new')
+        self.recompute.assert_called_once_with()
+
+    def test_stale_cache_counters_command(self):
+        stale_cache.increment_counter('stale_serves')
+        out = StringIO()
+        call_command('stale_cache_counters', '--reset', stdout=out)
+        self.assertIn('stale_serves: 1', out.getvalue())
+        self.assertEqual(get_counters(), {'lock_waits': 0, 'stale_serves': 0})
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
+class StalePageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.article = ArticleFactory()
+        self.url = reverse('my_newsapp:home')
+
+    def tearDown(self):
+        # LocaleMiddleware leaves language of the last request activated
+        translation.activate('en')
+
+    def test_stale_home_page_is_served_while_it_is_rendered(self):
+        key = page_cache_key(self.client.get(self.url).wsgi_request)
+        purge_page_cache_tags('home')
+        with recompute_lock(key):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'STALE')
+        self.assertEqual(get_counters()['stale_serves'], 1)
+
+        self.assertFalse(self.client.get(self.url).has_header('X-Page-Cache')) # lock released - page is rendered
+        self.assertEqual(self.client.get(self.url)['X-Page-Cache'], 'HIT')
+
+    @patch.object(stale_cache, 'STALE_CACHE_WAIT', 0)
+    def test_stale_article_page_is_not_served(self):
+        url = self.article.get_absolute_url()
+        key = page_cache_key(self.client.get(url).wsgi_request)
+        purge_page_cache_tags(f'article:{self.article.id}')
+        with recompute_lock(key):
+            response = self.client.get(url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertEqual(get_counters()['lock_waits'], 1)
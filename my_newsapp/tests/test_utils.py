@@ -1,15 +1,18 @@
-import tempfile
 import io
 from unittest.mock import patch, mock_open
 
-from django.test import TestCase, override_settings
+from django.test import TestCase
+from django.core.cache import cache
 
-from my_newsapp.utils import (get_status_none_categories_random_ids, content_type, field_values, 
-    get_test_files_dir_path, get_test_file)
+from my_newsapp.utils import (get_status_none_categories_random_ids, get_status_none_category_ids, content_type,
+    field_values, get_test_files_dir_path, get_test_file)
 from my_newsapp.tests.factories import CategoryFactory, ArticleFactory, ImageFactory, FileFactory
+from my_newsapp.tests.test_views import TemporaryMediaRootMixin
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class UtilsTests(TestCase):
+class UtilsTests(TemporaryMediaRootMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
 
     def test_get_status_none_categories_random_ids(self):
         primary = CategoryFactory(status='P')
@@ -36,6 +39,25 @@ class UtilsTests(TestCase):
 
         # check that there is not primary.id, nor secondary.id in returned list
         self.assertFalse(primary.id in none_ids or secondary.id in none_ids)
+
+    def test_get_status_none_categories_random_ids__count_and_seed(self):
+        CategoryFactory.create_batch(size=10)
+        ids = get_status_none_categories_random_ids(count=2, seed=42)
+        self.assertEqual(len(ids), 2)
+        with self.assertNumQueries(0): # ids are cached
+            self.assertEqual(get_status_none_categories_random_ids(count=2, seed=42), ids)
+        self.assertEqual(len(get_status_none_categories_random_ids(count=20)), 10)
+
+    def test_status_none_category_ids_are_refreshed_on_category_change(self):
+        category = CategoryFactory()
+        self.assertEqual(get_status_none_category_ids(), [category.id])
+        new_category = CategoryFactory()
+        self.assertEqual(get_status_none_category_ids(), [category.id, new_category.id])
+        category.status = 'P'
+        category.save()
+        self.assertEqual(get_status_none_category_ids(), [new_category.id])
+        new_category.delete()
+        self.assertEqual(get_status_none_category_ids(), [])
     
     def test_content_type(self):
         file_path = 'my_newsapp/tests/test_files/test_pdf_file.pdf'
@@ -1,3 +1,5 @@
+import os
+import shutil
 import tempfile
 from unittest import skip
 
@@ -5,16 +7,20 @@ from django.test import TestCase, RequestFactory, TransactionTestCase, override_
 from django.urls import reverse
 from django.views.generic import TemplateView
 from django.db.models.query import QuerySet
-from django.core.paginator import InvalidPage
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth.models import User
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.utils import translation
 
 from my_newsapp.views import NavigationContextMixin, HomeViewMixin
-from my_newsapp.tests.factories import CategoryFactory, ArticleFactory, ImageFactory, FileFactory
+from my_newsapp.tests.factories import CategoryFactory, ArticleFactory, ImageFactory, FileFactory, AudioFactory
 from my_newsapp.models import Category, Article
-from my_newsapp.utils import get_status_none_categories_random_ids, get_test_file, field_values
+from my_newsapp.utils import get_test_file, field_values
 from my_newsapp.views import CategoryView, ArticleDetailView
 from my_newsapp.forms import ArticleForm, ImageInlineFormSet, FileInlineFormSet
+from comments.tests.factories import CommentFactory
 
 # from https://tech.people-doc.com/django-unit-test-your-views.html
 def setup_view(view, request, *args, **kwargs):
@@ -31,6 +37,37 @@ def delete_article_test_files(article):
         image.image.delete() 
     for file in article.files.all():
         file.file.delete() 
+    for audio in article.audios.all():
+        audio.audio.delete()
+
+# region
+# Tests which upload files (article images, files and audios) get MEDIA_ROOT of their own - a temporary directory,
+# removed together with everything uploaded to it after the test class - so they never write to project's media/
+# directory, and files left behind by a failed test don't pile up in system's temp directory.
+# endregion
+class TemporaryMediaRootMixin:
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_root_settings = override_settings(MEDIA_ROOT=cls.media_root + '/')
+        cls.media_root_settings.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls.remove_media_root()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls.remove_media_root()
+
+    @classmethod
+    def remove_media_root(cls):
+        cls.media_root_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
 
 @override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')    
 class NavigationContextMixinTests(TestCase):
@@ -39,17 +76,26 @@ class NavigationContextMixinTests(TestCase):
         pass
 
     def setUp(self):
+        cache.clear()
         self.test_view = self.TestView()
 
     def test_no_category_objects(self):
         context = self.test_view.get_context_data()
-        self.assertEqual(list(context['categories']), list(Category.objects.all()))
-        self.assertEqual(list(context['categories']), [])
+        self.assertEqual(context['categories'], [])
 
     def test_with_category_objects(self):
         CategoryFactory.create_batch(size=3)
+        ArticleFactory.create_batch(size=2, category=Category.objects.first())
         context = self.test_view.get_context_data()
-        self.assertEqual(list(context['categories']), list(Category.objects.all()))
+        # only categories which have articles are shown in navigation
+        self.assertEqual([category['title'] for category in context['categories']], [Category.objects.first().title])
+        self.assertEqual(len(context['categories'][0]['articles']), 2)
+
+    def test_navigation_is_served_from_cache(self):
+        ArticleFactory.create_batch(size=3)
+        self.test_view.get_context_data() # builds and caches navigation tree
+        with self.assertNumQueries(0):
+            self.test_view.get_context_data()
 
 @override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')       
 class HomeViewMixinTests(TestCase):
@@ -61,85 +107,6 @@ class HomeViewMixinTests(TestCase):
         CategoryFactory.create_batch(size=3)
         self.test_view = self.TestView()
 
-    def rand_ids(self):
-        return get_status_none_categories_random_ids()
-
-    def test_get_primary_category_method__primary_category_exists(self):
-        CategoryFactory(status='P')
-        returned_category = self.test_view.get_primary_category(self.rand_ids())
-        self.assertEqual(returned_category.status, 'P')
-
-    def test_get_primary_category_method__primary_category_doesnt_exist(self):
-        returned_category = self.test_view.get_primary_category(self.rand_ids())
-        self.assertEqual(returned_category.status, None)
-        self.assertTrue(returned_category in Category.objects.all())
-
-    def test_get_primary_category_method__no_category_exists(self):
-        Category.objects.all().delete()  # now rand_ids will be empty
-        returned_category = self.test_view.get_primary_category(self.rand_ids())
-        self.assertTrue(returned_category == None)
-
-    def test_get_secondary_category_method__secondary_category_exists(self):
-        CategoryFactory(status='S')
-        returned_category = self.test_view.get_secondary_category(self.rand_ids())
-        self.assertEqual(returned_category.status, 'S')
-
-    def test_get_secondary_category_method__secondary_category_doesnt_exist(self):
-        returned_category = self.test_view.get_secondary_category(self.rand_ids())
-        self.assertEqual(returned_category.status, None)
-        self.assertTrue(returned_category in Category.objects.all())
-
-    def test_get_secondary_category_method__no_category_exists(self):
-        Category.objects.all().delete() # now rand_ids will be empty
-        returned_category = self.test_view.get_secondary_category(self.rand_ids())
-        self.assertTrue(returned_category == None)
-
-    def test_get_other_articles_method__only_status_none_categories(self):
-        # create one article for each category
-        for category in Category.objects.all():
-            ArticleFactory(category=category)
-
-        # test for 5 or less articles
-        articles = self.test_view.get_other_articles(self.rand_ids())
-        self.assertTrue(articles.count() == 3)
-
-        # create 2 more articles for each category
-        for category in Category.objects.all():
-            ArticleFactory.create_batch(size=2, category=category)
-
-        # test for more than 5 articles
-        articles = self.test_view.get_other_articles(self.rand_ids())
-        self.assertTrue(Article.objects.count() == 9) # now there are 9 articles whose category has status=None
-        self.assertTrue(articles.count() == 6) # but method returns maximum 6 articles
-
-        for article in articles:
-            self.assertTrue(article.category.status == None)
-
-    def test_get_other_articles_method__primary_and_secondary_category_exist(self):
-        CategoryFactory(status='P')
-        CategoryFactory(status='S')
-
-        # creates 10 articles, 2 for each of 5 categories
-        for category in Category.objects.all():
-            ArticleFactory.create_batch(size=2, category=category)
-
-        articles = self.test_view.get_other_articles(self.rand_ids())
-        self.assertTrue(articles.count() == 6) # only 6 articles belong to categories with status=None
-        for article in articles:
-            self.assertTrue(article.category.status == None)
-
-    def test_get_other_articles_method__no_articles_exists(self):
-        articles = self.test_view.get_other_articles(self.rand_ids())
-
-        self.assertEqual(articles.count(), 0)
-
-    def test_get_other_articles_method__no_category_exist(self):
-        Category.objects.all().delete() # now rand_ids will be empty
-        articles = self.test_view.get_other_articles(self.rand_ids())
-
-        self.assertEqual(articles.count(), 0)
-        
-
     def test_context_primary_and_secondary_category_objects_exist(self):
         CategoryFactory(status='P')
         CategoryFactory(status='S')
@@ -260,29 +227,48 @@ class LatestArticlesViewTests(TestCase):
         self.assertEqual(response.content, response_page_one_querystring.content)
 
     def test_paginator_page_1(self):
-        page_1 = self.client.get(reverse('my_newsapp:latest-articles') + '?page=1')
+        page_1 = self.client.get(reverse('my_newsapp:latest-articles'))
         self.assertEqual(page_1.status_code, 200)
         self.assertTemplateUsed('my_newsapp/latest_articles.html')
         self.assertTemplateUsed('my_newsapp/navigation.html')
         self.assertContains(page_1, 'Latest Articles')
         self.assertTrue('articles' in page_1.context)
         self.assertEqual(len(page_1.context['articles']), 5)
+        self.assertFalse(page_1.context['page_obj'].has_previous())
+        self.assertContains(page_1, '?after={}'.format(page_1.context['page_obj'].next_cursor))
 
     def test_paginator_page_2(self):
-        page_2 = self.client.get(reverse('my_newsapp:latest-articles') + '?page=2')
+        page_1 = self.client.get(reverse('my_newsapp:latest-articles'))
+        page_2 = self.client.get(
+            reverse('my_newsapp:latest-articles') + '?after=' + page_1.context['page_obj'].next_cursor)
         self.assertEqual(page_2.status_code, 200)
         self.assertTemplateUsed('my_newsapp/latest_articles.html')
         self.assertTemplateUsed('my_newsapp/navigation.html')
         self.assertContains(page_2, 'Latest Articles')
         self.assertTrue('articles' in page_2.context)
-        self.assertEqual(len(page_2.context['articles']), 3) # as paginate_by = 5, 3 articles are left for 3rd page.
+        self.assertEqual(len(page_2.context['articles']), 3) # as paginate_by = 5, 3 articles are left for 2nd page.
+        self.assertEqual(list(page_2.context['articles']), list(Article.objects.order_by('-pub_date', '-id')[5:]))
+        self.assertFalse(page_2.context['page_obj'].has_next())
+
+        # previous link leads back to page 1
+        page_1_again = self.client.get(
+            reverse('my_newsapp:latest-articles') + '?before=' + page_2.context['page_obj'].previous_cursor)
+        self.assertEqual(list(page_1_again.context['articles']), list(page_1.context['articles']))
+        self.assertFalse(page_1_again.context['page_obj'].has_previous())
     
     def test_paginator_non_existing_page(self):
-        page_3 = self.client.get(reverse('my_newsapp:latest-articles') + '?page=3')
+        page_3 = self.client.get(reverse('my_newsapp:latest-articles') + '?after=invalid-cursor')
         self.assertTemplateNotUsed('my_newsapp/latest_articles.html')
         self.assertTemplateUsed('my_newsapp/navigation.html')
         self.assertEqual(page_3.status_code, 404)
-        self.assertRaises(InvalidPage)
+
+    def test_paginator_both_cursors(self):
+        page_1 = self.client.get(reverse('my_newsapp:latest-articles'))
+        page_2 = self.client.get(
+            reverse('my_newsapp:latest-articles') + '?after=' + page_1.context['page_obj'].next_cursor)
+        response = self.client.get(reverse('my_newsapp:latest-articles') + '?after={}&before={}'.format(
+            page_1.context['page_obj'].next_cursor, page_2.context['page_obj'].previous_cursor))
+        self.assertEqual(response.status_code, 404)
 
 @override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
 class CategoryViewTests(TestCase):
@@ -298,7 +284,7 @@ class CategoryViewTests(TestCase):
         self.assertEqual(response.content, response_page_one_querystring.content)
 
     def test_paginator_page_1(self):
-        page_1 = self.client.get(self.url + '?page=1')
+        page_1 = self.client.get(self.url)
         self.assertEqual(page_1.status_code, 200)
         self.assertTemplateUsed('my_newsapp/category.html')
         self.assertTemplateUsed('my_newsapp/navigation.html')
@@ -307,20 +293,37 @@ class CategoryViewTests(TestCase):
         self.assertEqual(len(page_1.context['articles']), 5)
 
     def test_paginator_page_2(self):
-        page_2 = self.client.get(self.url + '?page=2')
+        ArticleFactory.create_batch(size=2) # other category's articles are not paginated
+        page_1 = self.client.get(self.url)
+        page_2 = self.client.get(self.url + '?after=' + page_1.context['page_obj'].next_cursor)
         self.assertEqual(page_2.status_code, 200)
         self.assertTemplateUsed('my_newsapp/category.html')
         self.assertTemplateUsed('my_newsapp/navigation.html')
         self.assertContains(page_2, self.test_category.title)
         self.assertTrue('articles' in page_2.context)
-        self.assertEqual(len(page_2.context['articles']), 3) # as paginate_by = 5, 3 articles are left for 3rd page.
+        self.assertEqual(len(page_2.context['articles']), 3) # as paginate_by = 5, 3 articles are left for 2nd page.
     
     def test_paginator_non_existing_page(self):
-        page_3 = self.client.get(self.url + '?page=3')
+        page_3 = self.client.get(self.url + '?after=invalid-cursor')
         self.assertTemplateNotUsed('my_newsapp/category.html')
         self.assertTemplateUsed('my_newsapp/navigation.html')
         self.assertEqual(page_3.status_code, 404)
-        self.assertRaises(InvalidPage)
+
+    def test_deep_page_costs_the_same_as_page_1(self):
+        ArticleFactory.create_batch(size=22, category=self.test_category) # 30 articles - 6 full pages
+        self.client.get(reverse('my_newsapp:home')) # builds navigation tree cache
+        with CaptureQueriesContext(connection) as page_1_queries:
+            response = self.client.get(self.url)
+        for _ in range(4):
+            response = self.client.get(self.url + '?after=' + response.context['page_obj'].next_cursor)
+        with CaptureQueriesContext(connection) as page_6_queries:
+            response = self.client.get(self.url + '?after=' + response.context['page_obj'].next_cursor)
+
+        self.assertEqual(len(response.context['articles']), 5)
+        self.assertFalse(response.context['page_obj'].has_next())
+        self.assertEqual(len(page_6_queries), len(page_1_queries))
+        for query in page_6_queries.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'])
 
     def test_get_category_method(self):
         # as get_category() doesn't use request object, we create one with empty path, just to pass it to setup_view().
@@ -339,8 +342,7 @@ class CategoryViewTests(TestCase):
 
         self.assertEqual(list(view.get_queryset()), list(Article.objects.filter(category=view.get_category())))
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class ArticleDetailViewTests(TestCase):
+class ArticleDetailViewTests(TemporaryMediaRootMixin, TestCase):
     
     def setUp(self):
         self.user = User.objects.create_user(username='testuser', password='testpass123')      
@@ -444,8 +446,71 @@ class ArticleDetailViewTests(TestCase):
         self.assertTrue('comments_owner_model_name' in request.session)
         self.assertTrue('comments_owner_id' in request.session)
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class CreateArticleViewTests(TestCase):
+class ConditionalGetMixinTests(TemporaryMediaRootMixin, TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.article = ArticleFactory()
+        ImageFactory(article=self.article)
+        self.urls = [
+            reverse('my_newsapp:home'),
+            reverse('my_newsapp:latest-articles'),
+            self.article.category.get_absolute_url(),
+            self.article.get_absolute_url(),
+        ]
+
+    def test_not_modified_with_etag(self):
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_article_page_is_revalidated_not_refetched(self):
+        url = self.article.get_absolute_url()
+        response = self.client.get(url)
+        cache_control = response['Cache-Control']
+        self.assertIn('private', cache_control)
+        self.assertIn('no-cache', cache_control)
+        self.assertNotIn('no-store', cache_control) # browser which doesn't store the page never revalidates it
+        repeated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 304)
+        self.assertEqual(repeated['ETag'], response['ETag'])
+
+    def test_not_modified_with_last_modified(self):
+        for url in self.urls:
+            last_modified = self.client.get(url)['Last-Modified']
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 304)
+
+    def test_modified_after_comment_is_created(self):
+        url = self.article.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        self.article.refresh_from_db()
+        initial_updated_at = self.article.updated_at
+
+        CommentFactory(object_id=self.article.id)
+
+        self.article.refresh_from_db()
+        self.assertGreater(self.article.updated_at, initial_updated_at)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_modified_after_article_is_deleted(self):
+        other_article = ArticleFactory()
+        url = reverse('my_newsapp:latest-articles')
+        etag = self.client.get(url)['ETag']
+        other_article.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_differs_for_logged_in_user(self):
+        url = self.article.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+class CreateArticleViewTests(TemporaryMediaRootMixin, TestCase):
 
     def setUp(self):
         self.user = User.objects.create_user(username='testuser', password='testpass123')
@@ -703,8 +768,7 @@ class CreateArticleViewTests(TestCase):
         article.images.first().image.delete()
         article.files.first().file.delete()
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class EditArticleViewTests(TransactionTestCase):
+class EditArticleViewTests(TemporaryMediaRootMixin, TransactionTestCase):
     
     def setUp(self):
         self.user = User.objects.create_user(username='testuser', password='testpass123')
@@ -793,8 +857,10 @@ class EditArticleViewTests(TransactionTestCase):
         # check that self.article and updated_article are actually the same instance
         self.assertEqual(self.article, updated_article)
 
-        # check that article field values, including images and files didn't change
-        self.assertFalse(any([self.initial_values[field] != updated_values[field] for field in self.initial_values.keys()]))
+        # check that article field values, including images and files didn't change (except updated_at, which is
+        # bumped on every save)
+        self.assertFalse(any([self.initial_values[field] != updated_values[field]
+                              for field in self.initial_values.keys() if field != 'updated_at']))
 
     def test_post_when_article_form_fields_change(self):
         data = self.initial_data
@@ -1008,8 +1074,7 @@ class MyNewsappLogoutViewTests(TestCase):
 
         self.assertRedirects(response, reverse('my_newsapp:login'))
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir() + '/')
-class DownloadFileTests(TestCase):
+class DownloadFileTests(TemporaryMediaRootMixin, TestCase):
     
     def setUp(self):
         self.file = FileFactory(file=get_test_file('test_doc_file.doc'))
@@ -1035,3 +1100,122 @@ class DownloadFileTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], self.file.content_type())
         self.assertIn(self.file.name(), response['Content-Disposition'])
+        response.close()
+
+    def get_content(self, **headers):
+        response = self.client.get(self.url, **headers)
+        return response, b''.join(response.streaming_content)
+
+    def read_file(self):
+        with open(self.file.path(), 'rb') as file:
+            return file.read()
+
+    def test_file_is_streamed(self):
+        response, content = self.get_content()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(content, self.read_file())
+        self.assertEqual(response['Content-Length'], str(len(content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range_request(self):
+        data = self.read_file()
+        response, content = self.get_content(HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, data[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/{}'.format(len(data)))
+        self.assertEqual(response['Content-Type'], self.file.content_type())
+
+    def test_range_request_with_matching_if_range(self):
+        etag = self.get_content()[0]['ETag']
+        response, content = self.get_content(HTTP_RANGE='bytes=10-', HTTP_IF_RANGE=etag)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, self.read_file()[10:])
+
+    def test_range_request_with_stale_if_range_gets_whole_file(self):
+        response, content = self.get_content(HTTP_RANGE='bytes=10-', HTTP_IF_RANGE='"old-etag"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, self.read_file())
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100000000-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */{}'.format(os.path.getsize(self.file.path())))
+
+    @override_settings(FILEPROVIDER_NAME='nginx', FILE_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_x_accel_redirect_offload(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + str(self.file.file))
+        self.assertEqual(response['Content-Type'], self.file.content_type())
+        self.assertIn(self.file.name(), response['Content-Disposition'])
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILEPROVIDER_NAME='apache')
+    def test_x_sendfile_offload(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Sendfile'], self.file.path())
+
+    @override_settings(FILEPROVIDER_NAME='nginx')
+    def test_offloaded_file_doesnt_exist(self):
+        self.file.file.delete()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 404)
+
+@override_settings(AUDIO_CACHE_MAX_AGE=3600)
+class StreamAudioTests(TemporaryMediaRootMixin, TestCase):
+
+    def setUp(self):
+        self.audio = AudioFactory()
+        self.url = reverse('my_newsapp:stream-audio', kwargs={'id': self.audio.id})
+        with open(self.audio.path(), 'rb') as audio:
+            self.data = audio.read()
+
+    def tearDown(self):
+        delete_article_test_files(self.audio.article)
+        translation.activate('en')
+
+    def test_audio_doesnt_exist(self):
+        response = self.client.get(reverse('my_newsapp:stream-audio', kwargs={'id': 100}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_audio_is_streamed(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['Content-Type'], 'audio/mpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_seeking(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=512-')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.data[512:])
+        self.assertEqual(response['Content-Range'], 'bytes 512-{}/{}'.format(len(self.data) - 1, len(self.data)))
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+    def test_cached_audio_is_not_sent_again(self):
+        response = self.client.get(self.url)
+        response.close()
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+    def test_player_on_article_page(self):
+        article = self.audio.article
+        response = self.client.get(reverse('my_newsapp:article-detail', kwargs={
+            'category': article.category.slug, 'id': article.id, 'slug': article.slug}))
+
+        self.assertContains(response, '<audio controls preload="metadata" src="{}">'.format(self.url))
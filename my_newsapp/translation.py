@@ -3,5 +3,5 @@ from .models import Article
 
 @register(Article)
 class CommentTranslationOptions(TranslationOptions):
-    fields = ('title', 'slug', 'text', 'short_description')
+    fields = ('title', 'slug', 'text', 'text_html', 'short_description')
     description = "Article translation"
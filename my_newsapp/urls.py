@@ -14,6 +14,7 @@ urlpatterns = [
         views.ArticleDetailView.as_view(), name='article-detail'),
     url(r'^edit-article/(?P<id>\d+)/$', views.EditArticleView.as_view(), name='edit-article'),
     url(r'^download-file/(?P<id>\d+)/$', views.download_file, name='download-file'),
+    url(r'^stream-audio/(?P<id>\d+)/$', views.stream_audio, name='stream-audio'),
     url(r'^delete-article/(?P<id>\d+)/$', views.DeleteArticleView.as_view(), name='delete-article'),
     url(r'^export-article/(?P<id>\d+)/$', views.ExportToXLSX.as_view(), name='export-article'),
     url(r'^$', views.HomeView.as_view(), name='home'),
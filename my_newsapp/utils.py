@@ -1,20 +1,43 @@
 import os
-from random import shuffle
+from random import Random
 
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
+from .cache_keys import cache_key
 from .models import Category
 
-# returns ids of Category instances whose status field value is None. Ovo koristim u HomeViewMixin-u gdje definiram
-# context za HomeView
-def get_status_none_categories_random_ids():
-    ids = []
-    for category in Category.objects.filter(status=None):
-        ids.append(category.id)
-    shuffle(ids)
+# region
+# Ids of categories without status are kept in cache (deleted on every Category change, see receiver below), so home
+# page doesn't query categories just to pick random ones. Sample is drawn in memory - random.sample() picks count
+# ids without shuffling the whole pool. Same seed gives the same sample (tests, benchmarks, see HOME_RANDOM_SEED).
+# Ids are read from primary, even in requests which read from a replica (see db_router.py).
+# endregion
+STATUS_NONE_CATEGORY_IDS_KEY = 'status_none_category_ids'
+
+def get_status_none_category_ids():
+    key = cache_key(STATUS_NONE_CATEGORY_IDS_KEY)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(Category.objects.using('default').filter(status=None).order_by('id').values_list('id', flat=True))
+        cache.set(key, ids, None)
     return ids
 
+# returns count (all by default) random ids of Category instances whose status field value is None. Ovo koristim u
+# HomeViewMixin-u gdje definiram context za HomeView
+def get_status_none_categories_random_ids(count=None, seed=None):
+    ids = get_status_none_category_ids()
+    count = len(ids) if count is None else min(count, len(ids))
+    return Random(seed).sample(ids, count)
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def status_none_categories_changed(sender, **kwargs):
+    cache.delete(cache_key(STATUS_NONE_CATEGORY_IDS_KEY))
+
 def get_test_file(filename):
     file_path = f'{get_test_files_dir_path()}{filename}'
     with open(file_path, 'rb') as file: # 'rb' because SimpleUploadedFile requires bytes-like object, not 'str'
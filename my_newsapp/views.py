@@ -1,60 +1,86 @@
-import os
+import hashlib
 
 from django.views.generic import TemplateView, ListView, DetailView, CreateView, UpdateView, DeleteView, View
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, Http404, HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect
 from django.contrib.auth import views as auth_views
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import never_cache
-from django.views.decorators.http import require_http_methods
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_http_methods, condition
+from django.db.models import Max, Count, Prefetch
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404
-
-from .models import Article, Category, File
-from .utils import get_status_none_categories_random_ids
+from django.conf import settings
+
+from .models import Article, Category, Image, File, Audio
+from .home_page import (assemble_home_page, rotation_now, rotation_window, rotation_started_at, rotation_seconds_left,
+                        rotation_seed)
+from .navigation import get_navigation_tree
+from .page_cache import PageCacheMixin
+from .pagination import KeysetPaginationMixin
+from .file_serving import serve_file
+from .signed_media import signing_window, signing_started_at, signing_seconds_left
 from .forms import ArticleForm, ImageFormSet, FileFormSet, LoginForm
 from comments.views import CommentsContextMixin
 
-# defines context used by navigation which has to be shared between views
+# defines context used by navigation which has to be shared between views. Navigation tree is cached (see
+# navigation.py), so navigation costs no queries unless Article or Category has changed since last render.
 class NavigationContextMixin:
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = get_navigation_tree()
         return context
 
+# region
+# Answers If-None-Match/If-Modified-Since with 304 without rendering the page. As navigation (which lists every
+# category and article) is a part of every page, page is considered unchanged until any article changes - validators
+# are newest Article.updated_at (bumped also on category, image, file and comment changes) and articles count (so
+# deleting an article changes them too), both fetched with one query. ETag also depends on user (and user's csrf
+# token, which is rendered in forms), because logged in users get different page. Last-Modified is sent to anonymous
+# users only, as it can't tell one user's page from another's.
+# Responses are 'Cache-Control: private, no-cache' - browser keeps the page, but revalidates it on every request (and
+# gets 304 if it hasn't changed), and shared caches don't keep it at all. no-store (never_cache) must not be used
+# here, as browser which doesn't keep the page never sends validators.
+# endregion
+class ConditionalGetMixin:
+    def dispatch(self, request, *args, **kwargs):
+        conditional_dispatch = condition(etag_func=self.get_etag, last_modified_func=self.get_last_modified)
+        response = conditional_dispatch(super().dispatch)(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_validators(self):
+        if not hasattr(self, '_validators'):
+            self._validators = Article.objects.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        return self._validators
+
+    def get_etag(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        user = 'anonymous'
+        if request.user.is_authenticated:
+            user = '{}:{}'.format(request.user.pk, request.META.get('CSRF_COOKIE', ''))
+        value = '{}:{}:{}:{}'.format(validators['last_modified'], validators['count'], self.get_page_version(), user)
+        return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        return self.get_validators()['last_modified']
+
+    # changes page's ETag in views whose content changes without articles changing
+    def get_page_version(self):
+        return ''
+
+# home page context is assembled with fixed number of queries (see home_page.py)
 class HomeViewMixin:
-    categories = Category.objects.all()
+    rotation_time = None # current time if not set
 
     def get_context_data(self, *args, **kwargs):
-        rand_ids = get_status_none_categories_random_ids()
         context = super().get_context_data(*args, **kwargs)
-        home_context = {
-            'primary_category': self.get_primary_category(rand_ids),
-            'secondary_category': self.get_secondary_category(rand_ids),
-            'other_articles': self.get_other_articles(rand_ids)
-        }
-        context.update(home_context)
+        context.update(assemble_home_page(seed=rotation_seed(self.rotation_time)))
         return context
 
-    def get_primary_category(self, rand_ids):
-        if self.categories.has_primary():
-            return self.categories.get_primary()
-        return self.categories.get(id=rand_ids.pop()) if rand_ids else None
-
-    def get_secondary_category(self, rand_ids):
-        if self.categories.has_secondary():
-            return self.categories.get_secondary()
-        return self.categories.get(id=rand_ids.pop()) if rand_ids else None
-
-    # returns empty QuerySet if there are no articles in category, or no rand_ids (no category)
-    def get_other_articles(self, rand_ids):
-        other_articles = Article.objects.filter(category__pk__in=rand_ids)
-        if other_articles.count() < 6:
-            return other_articles
-        else:
-            return other_articles[:6]
-
 class FormsetsContextMixin:
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -70,32 +96,108 @@ class FormsetsContextMixin:
             })
         return context
 
-class HomeView(NavigationContextMixin, HomeViewMixin, TemplateView):
+# Random sections change once per rotation window (see home_page.py) - page is cached, and its ETag/Last-Modified
+# stay the same, until the window ends.
+class HomeView(ConditionalGetMixin, PageCacheMixin, NavigationContextMixin, HomeViewMixin, TemplateView):
     template_name = 'my_newsapp/home.html'
+    replica_reads = True
+    page_cache_tags = ('nav', 'home')
+    page_cache_serve_stale = True
+
+    def dispatch(self, request, *args, **kwargs):
+        self.rotation_time = rotation_now()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_page_cache_timeout(self):
+        return max(1, int(rotation_seconds_left(self.rotation_time)))
+
+    def get_page_version(self):
+        return rotation_window(self.rotation_time)
+
+    def get_last_modified(self, request, *args, **kwargs):
+        last_modified = super().get_last_modified(request, *args, **kwargs)
+        if last_modified is None:
+            return None
+        return max(last_modified, rotation_started_at(self.rotation_time))
+
+# With SIGNED_MEDIA_URLS page links files with urls signed for the current signing window (see signed_media.py) - page
+# is cached, and its ETag/Last-Modified stay the same, only until the window ends, so it never links expired urls.
+class SignedMediaUrlsMixin:
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['signed_media_urls'] = settings.SIGNED_MEDIA_URLS
+        return context
 
-class LatestArticlesView(NavigationContextMixin, ListView):
+    def get_page_cache_timeout(self):
+        timeout = super().get_page_cache_timeout()
+        if settings.SIGNED_MEDIA_URLS:
+            return max(1, min(timeout, int(signing_seconds_left())))
+        return timeout
+
+    def get_page_version(self):
+        if settings.SIGNED_MEDIA_URLS:
+            return signing_window()
+        return super().get_page_version()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        last_modified = super().get_last_modified(request, *args, **kwargs)
+        if last_modified is None or not settings.SIGNED_MEDIA_URLS:
+            return last_modified
+        return max(last_modified, signing_started_at())
+
+# Articles in lists are rendered with category, author and first image (thumbnail, article.images.first - which
+# reads prefetched images, as they are ordered).
+def with_article_list_relations(queryset):
+    return (queryset.select_related('category', 'author')
+            .prefetch_related(Prefetch('images', queryset=Image.objects.order_by('id'))))
+
+class LatestArticlesView(ConditionalGetMixin, PageCacheMixin, NavigationContextMixin, KeysetPaginationMixin, ListView):
     template_name = 'my_newsapp/latest_articles.html'
+    replica_reads = True
     context_object_name = 'articles'
     model = Article
     paginate_by = 5
+    page_cache_tags = ('nav', 'latest')
 
-class CategoryView(NavigationContextMixin, ListView):
+    def get_queryset(self):
+        return with_article_list_relations(super().get_queryset())
+
+class CategoryView(ConditionalGetMixin, PageCacheMixin, NavigationContextMixin, KeysetPaginationMixin, ListView):
     template_name = 'my_newsapp/category.html'
+    replica_reads = True
     context_object_name = 'articles'
     paginate_by = 5
+    page_cache_serve_stale = True
+
+    def get_page_cache_tags(self):
+        return ['nav', 'category:{}'.format(self.kwargs['slug'])]
 
     # gett-a Category instancu na temelju slug-a u url-u
     def get_category(self):
         return Category.objects.get(slug=self.kwargs['slug'])
 
     def get_queryset(self):
-        return self.get_category().articles.all()
+        self.category = self.get_category()
+        return with_article_list_relations(self.category.articles.all())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['category'] = self.category
+        return context
 
-@method_decorator(never_cache, name='dispatch')
-class ArticleDetailView(NavigationContextMixin, CommentsContextMixin, DetailView):
+class ArticleDetailView(SignedMediaUrlsMixin, ConditionalGetMixin, PageCacheMixin, NavigationContextMixin,
+                        CommentsContextMixin, DetailView):
     template_name = 'my_newsapp/detail.html'
+    replica_reads = True
     model = Article
 
+    # attachments and audio players are rendered from one query each
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related('files', 'audios')
+
+    def get_page_cache_tags(self):
+        return ['nav', 'article:{}'.format(self.kwargs['id']), 'category:{}'.format(self.kwargs['category'])]
+
 class CreateArticleView(LoginRequiredMixin, NavigationContextMixin, FormsetsContextMixin, CreateView):
     template_name = 'my_newsapp/create_article.html'
     form_class = ArticleForm
@@ -183,13 +285,20 @@ class MyNewsLogoutView(auth_views.LogoutView):
 
 def download_file(request, id):
     target = get_object_or_404(File, id=id)
-    file_path = os.path.join(target.path())
-    if os.path.exists(file_path) and not os.path.isdir(file_path):
-        with open(file_path, 'rb') as file:
-            response = HttpResponse(file.read(), content_type=target.content_type())
-            response['Content-Disposition'] = 'inline; filename=' + os.path.basename(file_path)
-            return response
-    raise Http404
+    if not target.file:
+        raise Http404
+    return serve_file(request, target.path(), target.file.name, target.mime_type)
+
+# Players seek with Range requests, which get just the requested part of the audio (see file_serving.py). Browser
+# keeps audio for AUDIO_CACHE_MAX_AGE, and revalidates it with ETag afterwards.
+def stream_audio(request, id):
+    target = get_object_or_404(Audio, id=id)
+    if not target.audio:
+        raise Http404
+    response = serve_file(request, target.path(), target.audio.name, target.content_type())
+    if response.status_code in (200, 206, 304):
+        patch_cache_control(response, public=True, max_age=settings.AUDIO_CACHE_MAX_AGE)
+    return response
 
 
 class ExportToXLSXView(View):